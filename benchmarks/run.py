@@ -0,0 +1,218 @@
+#!/usr/bin/env python
+""" SPRITE BENCHMARKS
+
+Measures the hot paths of the sprite package on synthetic data and writes the
+results as JSON, so that runs of different versions can be compared:
+
+* packing: `Atlas.add_component` throughput, and how many times the atlas
+  doubled and re-packed (`_reset`) along the way
+* dumping: `Atlas.dump_atlas` time and peak memory
+* loading: reading the atlas meta back into `SpriteComponent`s
+* playback: `SpriteAnimationPlayer.pass_animation_time` ticks per second
+
+Run `python benchmarks/run.py --help` for the parameters.
+"""
+
+
+import argparse
+import datetime as dt
+import io
+import json
+import os
+import platform
+import random
+import resource
+import sys
+import time
+import tracemalloc
+
+
+DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+PARENT_DIRECTORY = os.path.dirname(DIRECTORY)
+
+if (DIRECTORY.endswith("benchmarks")):
+    sys.path.append(PARENT_DIRECTORY)
+
+
+from PIL import Image
+import sprite
+from sprite.atlas import Atlas
+from sprite.component import SpriteComponent
+from sprite.animation import SpriteAnimation, SpriteAnimationStage, SpriteAnimationPlayer
+
+
+DISTRIBUTIONS = ["uniform", "square", "tall", "wide"]
+
+
+class CountingAtlas(Atlas):
+
+    def __init__(self, *args, **kwargs):
+        self.reset_count = 0
+        self.double_count = 0
+        super(CountingAtlas, self).__init__(*args, **kwargs)
+
+    def _reset(self):
+        self.reset_count += 1
+        super(CountingAtlas, self)._reset()
+
+    def _double_size(self):
+        self.double_count += 1
+        super(CountingAtlas, self)._double_size()
+
+
+def generate_sizes(count, min_size, max_size, distribution, rand):
+    sizes = []
+    for _ in range(count):
+        a = rand.randint(min_size, max_size)
+        b = rand.randint(min_size, max_size)
+        if distribution == "square":
+            b = a
+        elif distribution == "tall":
+            a, b = min(a, b), max(a, b) * 2
+        elif distribution == "wide":
+            a, b = max(a, b) * 2, min(a, b)
+        sizes.append((a, b))
+    return sizes
+
+
+def generate_components(sizes, rand):
+    components = []
+    for i, size in enumerate(sizes):
+        color = tuple(rand.randint(0, 255) for _ in range(3)) + (255,)
+        image = Image.new("RGBA", size, color)
+        components.append(SpriteComponent("component{0}".format(i), image=image))
+    return components
+
+
+def bench_packing(components, min_size, allow_rotation):
+    atlas = CountingAtlas(min_size=min_size, allow_rotation=allow_rotation)
+    start = time.perf_counter()
+    for component in components:
+        atlas.add_component(component)
+    elapsed = time.perf_counter() - start
+    result = {
+        "seconds": elapsed,
+        "components_per_second": len(components) / elapsed if elapsed else None,
+        # the constructor resets once before any component is added
+        "resets": atlas.reset_count - 1,
+        "doublings": atlas.double_count,
+        "atlas_size": list(atlas.size),
+        "fill_ratio": (
+            float(sum(c.width * c.height for c in components)) /
+            (atlas.size[0] * atlas.size[1])
+        ),
+    }
+    return atlas, result
+
+
+def bench_dump(atlas):
+    output = io.BytesIO()
+    tracemalloc.start()
+    start = time.perf_counter()
+    atlas.dump_atlas(output)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "seconds": elapsed,
+        "bytes": len(output.getvalue()),
+        "python_peak_bytes": peak,
+        "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def bench_meta_load(atlas, repeat):
+    meta = json.dumps(atlas.get_meta())
+    start = time.perf_counter()
+    for _ in range(repeat):
+        components = {}
+        for component_meta in json.loads(meta):
+            component = SpriteComponent.from_meta(component_meta)
+            components[component.name] = component
+    elapsed = time.perf_counter() - start
+    return {
+        "seconds_per_load": elapsed / repeat,
+        "components": len(components),
+        "meta_bytes": len(meta),
+    }
+
+
+def bench_playback(player_count, stage_count, ticks, rand):
+    stages = [
+        SpriteAnimationStage("component{0}".format(i), rand.uniform(0.05, 0.3))
+        for i in range(stage_count)
+    ]
+    animation = SpriteAnimation("benchmark", stages)
+    players = []
+
+    def start(player):
+        player.add_end_callback(lambda extra_time: start(player))
+        player.start_animation()
+
+    for _ in range(player_count):
+        player = SpriteAnimationPlayer(None, animation)
+        start(player)
+        players.append(player)
+    step = dt.timedelta(seconds=1 / 60.0)
+    start_time = time.perf_counter()
+    for _ in range(ticks):
+        for player in players:
+            player.pass_animation_time(step)
+    elapsed = time.perf_counter() - start_time
+    return {
+        "seconds": elapsed,
+        "player_ticks_per_second": player_count * ticks / elapsed if elapsed else None,
+    }
+
+
+def run(args):
+    rand = random.Random(args.seed)
+    sizes = generate_sizes(args.components, args.min_size, args.max_size, args.distribution, rand)
+    components = generate_components(sizes, rand)
+    atlas, packing = bench_packing(
+        components, (args.atlas_size, args.atlas_size), args.allow_rotation
+    )
+    return {
+        "version": sprite.get_version(),
+        "python": platform.python_version(),
+        "timestamp": dt.datetime.now().isoformat(),
+        "parameters": vars(args),
+        "results": {
+            "packing": packing,
+            "dump": bench_dump(atlas),
+            "meta_load": bench_meta_load(atlas, args.repeat),
+            "playback": bench_playback(args.players, args.stages, args.ticks, rand),
+        },
+    }
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(description="Benchmark the sprite package")
+    parser.add_argument("--components", type=int, default=1000)
+    parser.add_argument("--min-size", type=int, default=8)
+    parser.add_argument("--max-size", type=int, default=64)
+    parser.add_argument("--distribution", choices=DISTRIBUTIONS, default="uniform")
+    parser.add_argument("--atlas-size", type=int, default=128, help="starting atlas size")
+    parser.add_argument("--allow-rotation", action="store_true")
+    parser.add_argument("--repeat", type=int, default=20, help="meta loads to average")
+    parser.add_argument("--players", type=int, default=1000)
+    parser.add_argument("--stages", type=int, default=8, help="stages per animation")
+    parser.add_argument("--ticks", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="JSON file to write, defaults to stdout")
+    return parser
+
+
+def main():
+    args = get_parser().parse_args()
+    results = run(args)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
+    else:
+        json.dump(results, sys.stdout, indent=4)
+        sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
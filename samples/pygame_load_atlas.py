@@ -15,9 +15,7 @@ import sys
 import os
 import datetime as dt
 import pygame
-import json
 from pygame.locals import QUIT
-from pygame import Rect
 
 
 DIRECTORY = os.path.dirname(__file__)
@@ -28,7 +26,8 @@ if (DIRECTORY.endswith("samples")):
     sys.path.append(PARENT_DIRECTORY)
 
 
-from sprite.component import SpriteComponent
+from sprite.component import read_meta
+from sprite.cache import FrameCache, PygameBackend
 
 
 GREY = (100, 100, 100)
@@ -47,11 +46,7 @@ class PygameAtlasSprite(pygame.sprite.Sprite):
         self.atlas = atlas
         self.multiplier = multiplier
         self.component = self.atlas.components[component_name]
-        self.image = pygame.Surface(self.component.size)
-        self.image.blit(atlas.image, (0, 0), Rect(*self.component.rect))
-        self.image = pygame.transform.scale(self.image, [a * multiplier for a in self.component.size])
-        self.multiplier = multiplier
-        self.component = atlas.components[component_name]
+        self.image = atlas.frames.get(component_name, scale=multiplier)
 
     @property
     def position(self):
@@ -70,12 +65,8 @@ class PygameAtlas(object):
 
     def __init__(self, image, meta):
         self.image = pygame.image.load(image)
-        self.components = {}
-        with open(meta) as f:
-            meta_dict = json.load(f)
-        for component_meta in meta_dict:
-            component = SpriteComponent.from_meta(component_meta)
-            self.components[component.name] = component
+        self.components = read_meta(meta)
+        self.frames = FrameCache(self.image, self.components, backend=PygameBackend())
 
 
 class SampleGame(object):
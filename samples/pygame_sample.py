@@ -24,7 +24,6 @@ import sys
 import os
 import datetime as dt
 import pygame
-import yaml
 from pygame.locals import QUIT
 
 
@@ -36,7 +35,7 @@ if (DIRECTORY.endswith("samples")):
     sys.path.append(PARENT_DIRECTORY)
 
 
-from sprite.animation import SpriteAnimationPlayer, SpriteAnimation, ZERO_TIME
+from sprite.animation import SpriteAnimationPlayer, ZERO_TIME, load_animations
 from sprite.component import SpriteComponent
 
 
@@ -168,12 +167,7 @@ class SampleGame(object):
         self.left_sprite = PygameSpriteRenderer(starting_component="left1")
 
     def load_animations(self):
-        with open(ANIMATION_META) as f:
-            data = yaml.load(f)
-        self.animations = {}
-        for animation_data in data["animations"]:
-            animation = SpriteAnimation.load(animation_data)
-            self.animations[animation.name] = animation
+        self.animations = load_animations(ANIMATION_META)
 
     def start_animations(self):
         self.start_left_animation()
@@ -2,11 +2,17 @@
 
 
 import datetime as dt
+import hashlib
 import logging
+import os
+import pickle
+from sprite import metrics
 
 
 LOG = logging.getLogger(__name__)
 ZERO_TIME = dt.timedelta()
+CACHE_SUFFIX = ".cache"
+CACHE_VERSION = 2
 
 
 # ANIMATION HOOKS
@@ -19,17 +25,30 @@ class SpriteAnimationStage(object):
         {"name": "duration"},
         {"name": "displacement_x", "default": 0},
         {"name": "displacement_y", "default": 0},
+        {"name": "events", "default": (), "omit_empty": True},
     ]
 
-    def __init__(self, component, duration, displacement_x=0, displacement_y=0):
+    def __init__(self, component, duration, displacement_x=0, displacement_y=0, events=None):
         self.component = component
+        self.component_name = getattr(component, "name", component)
         self.duration = duration
         self.displacement_x = displacement_x
         self.displacement_y = displacement_y
+        self.events = list(events or ())
 
     def get_params(self):
         return self.__getstate__()
 
+    def get_events(self):
+        """ Return the event markers of the stage as a sorted list of (time, name) tuples.  An
+        event is either a name, which fires as the stage starts, or a dictionary with a `name` and
+        a `time` in seconds from the start of the stage.  Times past the end of the stage are
+        fired as the stage ends.
+        """
+        if getattr(self, "_events", None) is None:
+            self._events = normalize_events(self.events, self.duration)
+        return self._events
+
     def update_renderer(self, renderer):
         renderer.set_component(**self.__getstate__())
 
@@ -37,7 +56,10 @@ class SpriteAnimationStage(object):
         state = {}
         for param in self.params:
             name = param["name"]
-            state[name] = getattr(self, name)
+            value = getattr(self, name)
+            if param.get("omit_empty") and not value:
+                continue
+            state[name] = value
         return state
 
     def __setstate__(self, state):
@@ -53,6 +75,21 @@ class SpriteAnimationStage(object):
             setattr(self, param["name"], value)
 
 
+def normalize_events(events, duration):
+    """ Return stage events as a sorted list of (time, name) tuples, see
+    `SpriteAnimationStage.get_events`.
+    """
+    normalized = []
+    for event in events:
+        if isinstance(event, dict):
+            time = min(event.get("time", 0), duration)
+            normalized.append((time, event["name"]))
+        else:
+            normalized.append((0, event))
+    normalized.sort(key=lambda x: x[0])
+    return normalized
+
+
 def get_animation_state(animation, secondary_values=True):
     """ Return a dictionary containing all the animation data """
     stages = list(animation.get_stages())
@@ -175,14 +212,37 @@ class SpriteAnimation(object):
     def get_stages(self):
         return self.stages
 
+    def set_components(self, components):
+        """ Set the component of each stage from a dictionary of components by name.  Stages
+        loaded from animation data only have a `component_name`, and need their components set
+        before the bounds of the animation, such as `width` and `offset`, can be calculated.
+        """
+        for stage in self.stages:
+            stage.component = components[stage.component_name]
+
 
 class SpriteAnimationPlayer(object):
+    """ Plays an animation by updating a renderer as time passes.  The renderer may be None, in
+    which case only the animation state, hooks and events are advanced.  The same happens while
+    the player is not `visible`, and the renderer is brought up to date once it is again.
+    """
+    zero_time = ZERO_TIME
 
     def __init__(self, renderer, animation):
         self.renderer = renderer
         self.animation = animation
         self.stage_index = 0
+        self.stage = None
+        self.stage_duration = self.zero_time
+        self.stage_time_remaining = self.zero_time
+        self.event_index = 0
+        self.visible = True
         self.callbacks = {}
+        self.event_callbacks = {}
+
+    def get_time(self, seconds):
+        """ Convert a time in seconds from the animation data into the player's time unit """
+        return dt.timedelta(seconds=seconds)
 
     def start_animation(self, extra_time=ZERO_TIME):
         self.stage_index = 0
@@ -194,24 +254,74 @@ class SpriteAnimationPlayer(object):
         except IndexError:
             self.end_animation(extra_time=extra_time)
         else:
-            self.stage.update_renderer(self.renderer)
-            self.stage_time_remaining = dt.timedelta(seconds=self.stage.duration)
+            if metrics.ENABLED:
+                metrics.incr("player.stage_transitions")
+            self.update_renderer()
+            self.stage_duration = self.get_time(self.stage.duration)
+            self.stage_time_remaining = self.stage_duration
+            self.event_index = 0
             self.pass_animation_time(extra_time)
 
     def pass_animation_time(self, time):
         if self.iscomplete():
             return
         self.stage_time_remaining -= time
-        if self.stage_time_remaining <= dt.timedelta():
+        self.dispatch_stage_events()
+        if self.stage_time_remaining <= self.zero_time:
             self.stage_index += 1
             self.start_next_stage(extra_time=-self.stage_time_remaining)
 
+    def dispatch_stage_events(self):
+        """ Execute the events of the current stage that have been reached, each with the time
+        that has passed since the event was due.
+        """
+        events = self.stage.get_events()
+        if self.event_index == len(events):
+            return
+        elapsed = self.stage_duration - self.stage_time_remaining
+        while self.event_index < len(events):
+            event_time = self.get_time(events[self.event_index][0])
+            if event_time > elapsed:
+                break
+            event = events[self.event_index][1]
+            self.event_index += 1
+            self.execute_event(event, extra_time=elapsed - event_time)
+
     def end_animation(self, extra_time=ZERO_TIME):
-        self.execute_hook(ON_ANIMATION_END)
+        self.execute_hook(ON_ANIMATION_END, extra_time=extra_time)
 
     def iscomplete(self):
         return self.stage_index == len(self.animation.stages)
 
+    def get_snapshot(self):
+        """ Return the playback state as a (stage_index, stage_time_remaining, event_index) tuple.
+        Callbacks are not part of the snapshot.
+        """
+        return (self.stage_index, self.stage_time_remaining, self.event_index)
+
+    def restore_snapshot(self, snapshot):
+        """ Restore the playback state from `get_snapshot`, without executing any events or
+        hooks.  The renderer, if any, is updated with the restored stage.
+        """
+        self.stage_index, self.stage_time_remaining, self.event_index = snapshot
+        if self.iscomplete():
+            return
+        self.stage = self.animation.stages[self.stage_index]
+        self.stage_duration = self.get_time(self.stage.duration)
+        self.update_renderer()
+
+    def update_renderer(self):
+        if self.renderer is not None and self.visible and self.stage is not None:
+            self.stage.update_renderer(self.renderer)
+
+    def set_visible(self, visible):
+        """ Set whether the renderer is updated as the animation plays """
+        if visible and not self.visible:
+            self.visible = True
+            if not self.iscomplete():
+                self.update_renderer()
+        self.visible = visible
+
     def add_end_callback(self, callback):
         self.add_callback(ON_ANIMATION_END, callback)
 
@@ -220,6 +330,112 @@ class SpriteAnimationPlayer(object):
         self.callbacks[hook].append(callback)
 
     def execute_hook(self, hook, extra_time=ZERO_TIME):
+        if metrics.ENABLED:
+            metrics.incr("player.hooks")
         callbacks = self.callbacks.pop(hook, [])
         for callback in callbacks:
             callback(extra_time=extra_time)
+
+    def add_event_callback(self, event, callback):
+        """ Add a callback for a stage event marker.  Unlike hook callbacks, event callbacks are
+        kept after they are executed, and are called every time the event is reached.
+        """
+        self.event_callbacks.setdefault(event, [])
+        self.event_callbacks[event].append(callback)
+
+    def execute_event(self, event, extra_time=ZERO_TIME):
+        if metrics.ENABLED:
+            metrics.incr("player.events")
+        for callback in self.event_callbacks.get(event, ()):
+            callback(extra_time=extra_time)
+
+
+class TickAnimationPlayer(SpriteAnimationPlayer):
+    """ A player that measures time in integer ticks rather than timedeltas, so that playback is
+    deterministic and its snapshots are small tuples of ints.  Stage durations and event times
+    are rounded to the nearest tick.  By default no renderer is used.
+    """
+    zero_time = 0
+
+    def __init__(self, animation, tick_rate, renderer=None):
+        self.tick_rate = tick_rate
+        super(TickAnimationPlayer, self).__init__(renderer, animation)
+
+    def get_time(self, seconds):
+        return int(round(seconds * self.tick_rate))
+
+    def start_animation(self, extra_time=0):
+        super(TickAnimationPlayer, self).start_animation(extra_time=extra_time)
+
+
+def _parse_yaml(source):
+    import yaml
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    return yaml.load(source, Loader=loader)
+
+
+def _read_animation_cache(cache_path, stat, digest):
+    """ Return the cached animation data for a source file, or None if the cache is missing or
+    stale.  The cache is only used when both the mtime and the hash of the source match, since
+    an edit that keeps the size can land within one tick of a coarse mtime.
+    """
+    try:
+        with open(cache_path, "rb") as f:
+            cache = pickle.load(f)
+    except (IOError, OSError, EOFError, pickle.UnpicklingError):
+        return None
+    if not isinstance(cache, dict) or cache.get("version") != CACHE_VERSION:
+        return None
+    if cache["mtime"] == stat.st_mtime and cache["digest"] == digest:
+        return cache["data"]
+    return None
+
+
+def _write_animation_cache(cache_path, stat, digest, data):
+    cache = {
+        "version": CACHE_VERSION,
+        "mtime": stat.st_mtime,
+        "digest": digest,
+        "data": data,
+    }
+    tmp_path = "{0}.{1}.tmp".format(cache_path, os.getpid())
+    try:
+        with open(tmp_path, "wb") as f:
+            pickle.dump(cache, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except (IOError, OSError) as e:
+        LOG.warning("Unable to write animation cache '%s': %s", cache_path, e)
+
+
+def load_animation_data(path, cache=True):
+    """ Return the raw data of an animation file.  The file is parsed with the libyaml loader when
+    it is available.  When `cache` is true, the parsed data is stored in a sidecar file next to
+    the source (`path + CACHE_SUFFIX`) which is read instead of parsing on later calls, for as long
+    as the mtime and hash of the source are unchanged.  The source is still read to hash it, but
+    not parsed.  The sidecar is a pickle, so it must not be writable by anyone that `path` would
+    not be trusted from.
+    """
+    with open(path, "rb") as f:
+        source = f.read()
+    if not cache:
+        return _parse_yaml(source)
+    cache_path = path + CACHE_SUFFIX
+    stat = os.stat(path)
+    digest = hashlib.sha1(source).hexdigest()
+    data = _read_animation_cache(cache_path, stat, digest)
+    if data is None:
+        data = _parse_yaml(source)
+        _write_animation_cache(cache_path, stat, digest, data)
+    return data
+
+
+def load_animations(path, cache=True, animation_class=SpriteAnimation):
+    """ Load an animation file and return a dictionary of its animations by name.  See
+    `load_animation_data` for how the file is read and cached.
+    """
+    data = load_animation_data(path, cache=cache)
+    animations = {}
+    for animation_data in data["animations"]:
+        animation = animation_class.load(animation_data)
+        animations[animation.name] = animation
+    return animations
@@ -1,5 +1,11 @@
-from PIL import Image, ImageDraw
+""" The atlas module packs components into atlas images.  Pillow is only imported when an
+atlas is built, so that importing this module stays cheap for code that only reads atlas meta.
+"""
+
+
+from math import gcd
 from sprite.component import SpriteComponent, Rect
+from sprite import metrics
 
 
 MIN_SIZE = (1024, 1024)
@@ -9,43 +15,136 @@ DEFAULT_HEADER_LINE_SPACING = 0
 HEADER_IMAGE_NAME = "ATLAS_HEADER"
 NAME_KEY = "name"
 RECT_KEY = "rect"
+BLOCK_SIZE = 4
+BC1 = "BC1"
+BC3 = "BC3"
+
+# SPLIT RULES, for how free space is divided around a placed component
+SPLIT_MAX_LEFTOVER = "max_leftover"
+SPLIT_MIN_LEFTOVER = "min_leftover"
+SPLIT_COLUMNS = "columns"
+SPLIT_ROWS = "rows"
+SPLIT_RULES = [SPLIT_MAX_LEFTOVER, SPLIT_MIN_LEFTOVER, SPLIT_COLUMNS, SPLIT_ROWS]
+
+# ORDERS, for the order components are packed in
+ORDER_INSERTION = "insertion"
+ORDER_HEIGHT = "height"
+ORDER_WIDTH = "width"
+ORDER_AREA = "area"
+ORDER_MAX_SIDE = "max_side"
+ORDER_PERIMETER = "perimeter"
+ORDER_KEYS = {
+    ORDER_HEIGHT: lambda size: (size[1], size[0]),
+    ORDER_WIDTH: lambda size: (size[0], size[1]),
+    ORDER_AREA: lambda size: size[0] * size[1],
+    ORDER_MAX_SIDE: lambda size: (max(size), min(size)),
+    ORDER_PERIMETER: lambda size: size[0] + size[1],
+}
+ORDERS = [ORDER_INSERTION] + sorted(ORDER_KEYS)
+
+
+def _align(value, alignment):
+    return -(-value // alignment) * alignment
+
+
+def _scale_rect(rect, scale):
+    """ Scale a rect by rounding its edges, so that rects that do not overlap before scaling do
+    not overlap after it either.
+    """
+    x, y = int(round(rect.x * scale)), int(round(rect.y * scale))
+    return Rect(
+        x, y,
+        int(round((rect.x + rect.width) * scale)) - x,
+        int(round((rect.y + rect.height) * scale)) - y,
+    )
+
+
+def _scale_component_rect(component, scale):
+    """ Scale the rect of a component, see `_scale_rect`.  Raises a ValueError if the scale
+    collapses the component to nothing.
+    """
+    rect = _scale_rect(component.rect, scale)
+    if rect.width < 1 or rect.height < 1:
+        raise ValueError(
+            "Scale {0} is too small for atlas component '{1}'".format(scale, component.name)
+        )
+    return rect
+
+
+def _get_text_size(draw, text):
+    # textsize was removed in Pillow 10 in favour of textbbox
+    if hasattr(draw, "textbbox"):
+        return draw.textbbox((0, 0), text)[2:]
+    return draw.textsize(text)
+
+
+def _split_columns(split, extra_width, extra_height):
+    if not extra_width or not extra_height:
+        return extra_width > extra_height
+    if split == SPLIT_MAX_LEFTOVER:
+        return extra_width > extra_height
+    if split == SPLIT_MIN_LEFTOVER:
+        return extra_width < extra_height
+    return split == SPLIT_COLUMNS
+
+
+def _order_names(sizes, order):
+    """ Return the names of `sizes`, a list of (name, size, ...) tuples, in packing order """
+    if order == ORDER_INSERTION:
+        return [entry[0] for entry in sizes]
+    key = ORDER_KEYS[order]
+    return [entry[0] for entry in sorted(sizes, key=lambda x: key(x[1]), reverse=True)]
 
 
 class _ImageContainer(object):
 
-    def __init__(self, rect):
+    def __init__(self, rect, alignment=1, split=SPLIT_MAX_LEFTOVER):
+        if metrics.ENABLED:
+            metrics.incr("atlas.containers")
         self.children = None
         self.rect = rect
+        self.alignment = alignment
+        self.split = split
 
-    def add_to_child(self, child_index, component):
+    def add_to_child(self, child_index, component, rotated=False):
         added = False
         try:
-            added = self.children[child_index].add_component(component)
+            added = self.children[child_index].add_component(component, rotated=rotated)
         except AttributeError as e:
             if "add_component" not in str(e):
                 raise
         return added
 
-    def add_component(self, component):
+    def add_component(self, component, rotated=False):
         if self.children:
-            return self.add_to_child(0, component) or self.add_to_child(1, component)
-        extra_width = self.rect.width - component.width
-        extra_height = self.rect.height - component.height
+            return (
+                self.add_to_child(0, component, rotated) or
+                self.add_to_child(1, component, rotated)
+            )
+        width, height = component.size
+        if rotated:
+            width, height = height, width
+        width, height = _align(width, self.alignment), _align(height, self.alignment)
+        extra_width = self.rect.width - width
+        extra_height = self.rect.height - height
         if extra_width < 0 or extra_height < 0:
             return False
-        if extra_width > extra_height:
-            rect1 = Rect(self.rect.x, self.rect.y, component.size[0], self.rect.height)
-            rect2 = Rect(self.rect.x + component.size[0], self.rect.y, extra_width, self.rect.height)
+        if _split_columns(self.split, extra_width, extra_height):
+            rect1 = Rect(self.rect.x, self.rect.y, width, self.rect.height)
+            rect2 = Rect(self.rect.x + width, self.rect.y, extra_width, self.rect.height)
         else:
-            rect1 = Rect(self.rect.x, self.rect.y, self.rect.width, component.height)
-            rect2 = Rect(self.rect.x, self.rect.y + component.height, self.rect.width, extra_height)
-        if rect1.size == component.size:
-            self.children = (component, _ImageContainer(rect2))
-            component.set_atlas_position(rect1.position)
+            rect1 = Rect(self.rect.x, self.rect.y, self.rect.width, height)
+            rect2 = Rect(self.rect.x, self.rect.y + height, self.rect.width, extra_height)
+        if rect1.size == (width, height):
+            self.children = (component, _ImageContainer(rect2, self.alignment, self.split))
+            component.set_atlas_position(rect1.position, rotated=rotated)
             return True
         else:
-            self.children = (_ImageContainer(rect1), _ImageContainer(rect2))
-            return self.children[0].add_component(component)
+            self.children = (
+                _ImageContainer(rect1, self.alignment, self.split),
+                _ImageContainer(rect2, self.alignment, self.split),
+            )
+            return self.children[0].add_component(component, rotated=rotated)
 
     def __unicode__(self):
         if self.children:
@@ -58,32 +157,66 @@ class _ImageContainer(object):
 
 
 class Atlas(object):
+    """ Packs components into a single image.  With `allow_rotation`, a component that does not
+    fit in its own orientation is tried rotated 90 degrees before the atlas is grown.  With an
+    `alignment`, every component is placed at a multiple of it and the space it takes up is
+    padded to a multiple of it, e.g. an alignment of `BLOCK_SIZE` keeps each component in its own
+    blocks for block compression.  With `mip_levels` above 1, the alignment is raised so that
+    components stay aligned and separate in every mipmap level, see `render_mipmaps`, and in
+    their own blocks in every level when the alignment is a multiple of `BLOCK_SIZE`.  `split`
+    is one of the `SPLIT_RULES` for dividing free space, and `optimize` can search for the split
+    rule and component order that give the smallest atlas.  Components added together with
+    `add_group` are kept in one region of the atlas.
+    """
 
-    def __init__(self, header="", min_size=MIN_SIZE):
+    def __init__(self, header="", min_size=MIN_SIZE, allow_rotation=False, alignment=1,
+                 mip_levels=1, split=SPLIT_MAX_LEFTOVER):
+        mip_alignment = 2 ** (mip_levels - 1)
+        if alignment % BLOCK_SIZE == 0:
+            # Keep components in their own blocks in the last level, not only the first
+            mip_alignment *= BLOCK_SIZE
+        alignment = alignment * mip_alignment // gcd(alignment, mip_alignment)
         self.components = {}
+        self.groups = {}
+        self._component_groups = {}
         self._header = header
-        self.size = min_size
+        self.min_size = (_align(min_size[0], alignment), _align(min_size[1], alignment))
+        self.size = self.min_size
+        self.allow_rotation = allow_rotation
+        self.alignment = alignment
+        self.mip_levels = mip_levels
+        self.split = split
         self._reset()
 
     def _reset(self):
-        self.root_container = _ImageContainer(Rect(0, 0, *self.size))
+        if metrics.ENABLED:
+            metrics.incr("atlas.resets")
+        self.root_container = _ImageContainer(
+            Rect(0, 0, *self.size), self.alignment, self.split
+        )
         oldcomponents = self.components
         oldcomponents.pop(HEADER_IMAGE_NAME, None)
         self.components = {}
+        self.groups = {}
         if self._header:
             self._add_header()
         for component in oldcomponents.values():
-            self.add_component(component)
+            group = self._component_groups.get(component.name)
+            if group is None:
+                self.add_component(component)
+            elif group.name not in self.groups:
+                self._add_group(group)
 
     def _add_header(self):
         header = self._header.format(size="{0}x{1}".format(*self.size))
         lines = header.split("\n")
+        from PIL import Image, ImageDraw
         dummydraw = ImageDraw.Draw(Image.new('RGBA', (1024, 1024)))
         width = (
-            max([dummydraw.textsize(line)[0] for line in lines]) +
+            max([_get_text_size(dummydraw, line)[0] for line in lines]) +
             2 * DEFAULT_HEADER_INDENT[0]
         )
-        lineheight = dummydraw.textsize("K1")[1] + DEFAULT_HEADER_LINE_SPACING
+        lineheight = _get_text_size(dummydraw, "K1")[1] + DEFAULT_HEADER_LINE_SPACING
         height = lineheight * (len(lines)) + 2 * DEFAULT_HEADER_INDENT[1]
         img = Image.new('RGBA', (width, height))
         draw = ImageDraw.Draw(img)
@@ -100,19 +233,337 @@ class Atlas(object):
         if component.name in self.components:
             raise KeyError("Atlas component with name '{0}' already exists".format(component.name))
         c = self.root_container.add_component(component)
+        if not c and self.allow_rotation:
+            c = self.root_container.add_component(component, rotated=True)
         if not c:
             self._double_size()
             self._reset()
-            self.add_component(component)
+            # _reset renders and adds the header again for the new size
+            if component.name != HEADER_IMAGE_NAME:
+                self.add_component(component)
         else:
             self.components[component.name] = component
 
-    def get_meta(self):
+    def add_group(self, name, components):
+        """ Add components that are kept together in one region of the atlas, such as the frames
+        of an animation, see `get_animation_groups`.  The components are packed into a region of
+        their own, which is then placed in the atlas as a whole.  The regions are returned by
+        `get_group_rects`.
+        """
+        if name in self.groups:
+            raise KeyError("Atlas group with name '{0}' already exists".format(name))
+        for component in components:
+            if component.name in self.components:
+                raise KeyError(
+                    "Atlas component with name '{0}' already exists".format(component.name)
+                )
+        self._add_group(
+            _Group(name, components, self.allow_rotation, self.alignment, self.split)
+        )
+
+    def _add_group(self, group):
+        if not self.root_container.add_component(group):
+            self._double_size()
+            self._reset()
+            self._add_group(group)
+        else:
+            self.groups[group.name] = group
+            for component in group.components:
+                self.components[component.name] = component
+                self._component_groups[component.name] = group
+
+    def get_group_rects(self, scale=1):
+        """ Return the rect of the region of each group by name """
+        return dict(
+            (name, _scale_rect(group.rect, scale)) for name, group in self.groups.items()
+        )
+
+    def _get_packing_sizes(self):
+        """ Return the (name, size, is_group) tuples that `optimize` packs, with each group as a
+        single entry, and the groups by the name used in their entry.
+        """
+        sizes = []
+        groups = {}
+        for name, component in self.components.items():
+            group = self._component_groups.get(name)
+            if group is None:
+                if name != HEADER_IMAGE_NAME:
+                    sizes.append((name, component.size, False))
+            elif (group.name,) not in groups:
+                groups[(group.name,)] = group
+                sizes.append(((group.name,), group.size, True))
+        return sizes, groups
+
+    def optimize(self, candidates=None, workers=None, timeout=None):
+        """ Re-pack the atlas with the (order, split) candidate that gives the smallest area.
+        `candidates` is a list of (order, split) tuples, from `ORDERS` and `SPLIT_RULES`, and
+        defaults to all combinations of them.  Groups are ordered as a whole, by the size of their
+        region.  Candidates are packed using component sizes only, in a pool of `workers`
+        processes, or in this process when `workers` is 0.  With a `timeout` in seconds, the pool
+        is terminated once it runs out, only the candidates packed by then are considered, and
+        the atlas is left as is if there are none.  Returns the chosen candidate, or None.
+        """
+        if candidates is None:
+            candidates = [(order, split) for order in ORDERS for split in SPLIT_RULES]
+        sizes, groups = self._get_packing_sizes()
+        settings = (self.min_size, self.allow_rotation, self.alignment, self._header)
+        jobs = [(sizes, order, split) + settings for order, split in candidates]
+        if workers == 0:
+            results = [_pack_sizes(*job) for job in jobs]
+        else:
+            results = _run_jobs(jobs, workers, timeout)
+        if not results:
+            return None
+        area, order, split = min(results, key=lambda result: result[0])
+        header = self.components.pop(HEADER_IMAGE_NAME, None)
+        components = self.components
+        self.components = {}
+        if header is not None:
+            self.components[HEADER_IMAGE_NAME] = header
+        for name in _order_names(sizes, order):
+            if name in groups:
+                for component in groups[name].components:
+                    self.components[component.name] = component
+            else:
+                self.components[name] = components[name]
+        self.split = split
+        self.size = self.min_size
+        self._reset()
+        return (order, split)
+
+    def get_meta(self, scale=1):
+        """ Return the meta of every component.  With a `scale`, the meta is that of the atlas
+        rendered by `render_atlas` with the same scale.  A scale that would shrink a component
+        to less than a pixel wide or high raises a ValueError.  Components in a group have a
+        "group" with its name and the rect of its region, see
+        `sprite.component.get_group_rects`.
+        """
         data = [component.get_meta() for component in self.components.values()]
+        for meta in data:
+            group = self._component_groups.get(meta["name"])
+            meta.pop("group", None)
+            if group is not None and self.groups.get(group.name) is group:
+                meta["group"] = _scale_rect(group.rect, scale).__getstate__()
+                meta["group"]["name"] = group.name
+        if scale != 1:
+            for meta, component in zip(data, self.components.values()):
+                rect = _scale_component_rect(component, scale)
+                meta["x"], meta["y"] = rect.position
+                meta["width"], meta["height"] = rect.size
+                if component.rotated:
+                    meta["width"], meta["height"] = rect.height, rect.width
         return data
 
+    def _get_component_image(self, component, scale, resample):
+        image = component.image
+        if scale != 1:
+            rect = _scale_component_rect(component, scale)
+            size = (rect.height, rect.width) if component.rotated else rect.size
+            image = image.resize(size, resample)
+        if component.rotated:
+            from PIL import Image
+            image = image.transpose(Image.ROTATE_90)
+        return image
+
+    def render_atlas(self, scale=1, resample=None, workers=None):
+        """ Return the atlas as a PIL image.  With a `scale`, the atlas is rendered at that scale
+        using the existing layout, resampling the components in a pool of `workers` threads.  By
+        default components are resampled with NEAREST when scaled up, to keep pixel art sharp,
+        and with BOX when scaled down.  As with `get_meta`, a scale that would shrink a component
+        to less than a pixel raises a ValueError.
+        """
+        from PIL import Image
+        if resample is None:
+            resample = Image.NEAREST if scale >= 1 else Image.BOX
+        components = list(self.components.values())
+        rects = [_scale_component_rect(component, scale) for component in components]
+        size = _scale_rect(Rect(0, 0, *self.size), scale).size
+        get_image = lambda c: self._get_component_image(c, scale, resample)
+        with metrics.timer("atlas.prepare_images"):
+            if scale == 1:
+                images = [get_image(component) for component in components]
+            else:
+                from concurrent.futures import ThreadPoolExecutor
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    images = list(executor.map(get_image, components))
+        with metrics.timer("atlas.paste"):
+            a = Image.new("RGBA", size)
+            for rect, image in zip(rects, images):
+                a.paste(image, rect.position)
+        return a
+
+    def render_mipmaps(self):
+        """ Return the atlas and its mipmaps as a list of `mip_levels` PIL images, each half the
+        size of the previous one.  Since components are aligned to a multiple of
+        2 ** (mip_levels - 1), each level is box filtered without mixing in neighbouring
+        components, and the rect of a component at each level is given by
+        `SpriteComponent.get_mip_rect`.
+        """
+        from PIL import Image
+        images = [self.render_atlas()]
+        for _ in range(1, self.mip_levels):
+            width, height = images[-1].size
+            images.append(images[-1].resize((width // 2, height // 2), Image.BOX))
+        return images
+
+    def _save(self, image, filepath):
+        with metrics.timer("atlas.encode"):
+            image.save(filepath, format="PNG")
+
     def dump_atlas(self, filepath):
-        a = Image.new("RGBA", self.size)
-        for component in self.components.values():
-            a.paste(component.image, (component.rect.x, component.rect.y))
-        a.save(filepath, format="PNG")
+        self._save(self.render_atlas(), filepath)
+
+    def dump_variants(self, filepath_template, scales, resample=None, workers=None):
+        """ Write the atlas at each of `scales`, e.g. [1, 2, 3], sharing the same layout.  The
+        path of each file is `filepath_template` formatted with the `scale`, e.g.
+        "atlas@{scale}x.png".  Returns a dictionary of the meta of each variant by scale.
+        """
+        metas = {}
+        for scale in scales:
+            image = self.render_atlas(scale=scale, resample=resample, workers=workers)
+            self._save(image, filepath_template.format(scale=scale))
+            metas[scale] = self.get_meta(scale=scale)
+        return metas
+
+    def dump_mipmaps(self, filepath_template):
+        """ Write each mipmap level to its own PNG file.  The path of each file is
+        `filepath_template` formatted with the `level`, e.g. "atlas_{level}.png".
+        """
+        for level, image in enumerate(self.render_mipmaps()):
+            self._save(image, filepath_template.format(level=level))
+
+    def dump_compressed_atlas(self, filepath, codec=BC3):
+        """ Write the atlas and its mipmaps as a block compressed DDS file, see
+        `sprite.compress`.  The atlas must be created with an alignment that is a multiple of
+        `BLOCK_SIZE` so no block is shared by two components.  Requires numpy.
+        """
+        if self.alignment % BLOCK_SIZE:
+            raise ValueError(
+                "Block compression requires an alignment that is a multiple of {0}, not {1}".format(
+                    BLOCK_SIZE, self.alignment
+                )
+            )
+        from sprite.compress import write_dds
+        images = self.render_mipmaps()
+        with metrics.timer("atlas.compress"):
+            write_dds(filepath, images, codec)
+
+
+class _SizeEntry(object):
+    """ Stands in for a component or a group when packing with sizes only """
+
+    def __init__(self, name, size):
+        self.name = name
+        self.size = size
+        self.width, self.height = size
+        self.rotated = False
+
+    @property
+    def components(self):
+        # A group stands in for itself, so that `Atlas._reset` finds it among the components
+        return (self,)
+
+    def set_atlas_position(self, x, y=None, rotated=False):
+        self.rotated = rotated
+
+
+def _pack_sizes(sizes, order, split, min_size, allow_rotation, alignment, header):
+    """ Pack `sizes`, a list of (name, size, is_group) tuples, and return the area of the
+    resulting atlas along with the order and split rule used.  This is run in worker processes by
+    `Atlas.optimize`, so it does not touch the component images.  The `header` is rendered as
+    in the real atlas, since its size depends on the size of the atlas.
+    """
+    atlas = Atlas(
+        header=header, min_size=min_size, allow_rotation=allow_rotation, alignment=alignment,
+        split=split
+    )
+    entries = dict((entry[0], entry) for entry in sizes)
+    for name in _order_names(sizes, order):
+        _, size, is_group = entries[name]
+        if is_group:
+            atlas._add_group(_SizeEntry(name, size))
+        else:
+            atlas.add_component(_SizeEntry(name, size))
+    return (atlas.size[0] * atlas.size[1], order, split)
+
+
+def _run_jobs(jobs, workers, timeout):
+    """ Run `_pack_sizes` for each job in a pool of `workers` processes, and return the results
+    of the jobs that finish within `timeout` seconds.  The pool is terminated afterwards, so no
+    worker keeps running past the timeout.
+    """
+    import multiprocessing
+    import time
+    pool = multiprocessing.Pool(processes=workers)
+    try:
+        pending = [pool.apply_async(_pack_sizes, job) for job in jobs]
+        deadline = None if timeout is None else time.monotonic() + timeout
+        results = []
+        for result in pending:
+            remaining = None
+            if deadline is not None:
+                remaining = max(0, deadline - time.monotonic())
+            try:
+                results.append(result.get(remaining))
+            except multiprocessing.TimeoutError:
+                continue
+        return results
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+class _Group(object):
+    """ Components packed into a region of their own, which is placed in an atlas as one """
+
+    def __init__(self, name, components, allow_rotation=False, alignment=1,
+                 split=SPLIT_MAX_LEFTOVER):
+        self.name = name
+        self.components = list(components)
+        if not self.components:
+            raise ValueError("Atlas group '{0}' has no components".format(name))
+        atlas = Atlas(
+            min_size=(
+                max(component.width for component in self.components),
+                max(component.height for component in self.components),
+            ),
+            allow_rotation=allow_rotation, alignment=alignment, split=split
+        )
+        for component in self.components:
+            atlas.add_component(component)
+        self.offsets = [
+            (component, component.rect.x, component.rect.y, component.rotated)
+            for component in self.components
+        ]
+        self.size = (
+            max(_align(c.rect.x + c.rect.width, alignment) for c in self.components),
+            max(_align(c.rect.y + c.rect.height, alignment) for c in self.components),
+        )
+        self.width, self.height = self.size
+        self.rect = None
+
+    def set_atlas_position(self, x, y=None, rotated=False):
+        if y is None:
+            x, y = x
+        self.rect = Rect(x, y, self.width, self.height)
+        for component, offset_x, offset_y, component_rotated in self.offsets:
+            component.set_atlas_position(x + offset_x, y + offset_y, rotated=component_rotated)
+
+
+def get_animation_groups(animations, components):
+    """ Return a list of (animation name, components) tuples, grouping the components in
+    `components`, a dictionary by name, by the animations whose stages use them, for
+    `Atlas.add_group`.  A component used by several animations is grouped with the first.
+    """
+    groups = []
+    grouped = set()
+    for animation in animations:
+        group = []
+        for stage in animation.stages:
+            name = stage.component_name
+            if name not in grouped and name in components:
+                grouped.add(name)
+                group.append(components[name])
+        if group:
+            groups.append((animation.name, group))
+    return groups
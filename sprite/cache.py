@@ -0,0 +1,272 @@
+""" The cache module extracts component frames from an atlas image and keeps them, so that
+sprites showing the same frame share one image instead of each extracting and scaling their own.
+
+A `FrameCache` is independent of the image library.  Frames are extracted, scaled and flipped
+by a backend, and `PillowBackend`, `NumpyBackend` and `PygameBackend` are provided.  Each
+backend only imports its library when it is used.
+
+A `FrameCache` can also reload its atlas while it is in use, see `FrameCache.reload`, so that
+an atlas rebuilt by an artist can be picked up by a running game.
+"""
+
+
+from collections import OrderedDict
+from sprite.component import SpriteComponent
+
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+class PillowBackend(object):
+    """ Frames from a PIL image """
+
+    def extract(self, source, rect):
+        return source.crop((rect.x, rect.y, rect.x + rect.width, rect.y + rect.height))
+
+    def unrotate(self, frame):
+        from PIL import Image
+        return frame.transpose(Image.ROTATE_270)
+
+    def scale(self, frame, size):
+        from PIL import Image
+        return frame.resize(size, Image.NEAREST)
+
+    def flip(self, frame, flip_x, flip_y):
+        from PIL import Image
+        if flip_x:
+            frame = frame.transpose(Image.FLIP_LEFT_RIGHT)
+        if flip_y:
+            frame = frame.transpose(Image.FLIP_TOP_BOTTOM)
+        return frame
+
+    def get_size_bytes(self, frame):
+        return frame.width * frame.height * len(frame.getbands())
+
+    def get_size(self, source):
+        return source.size
+
+    def region_equal(self, source, other, rect):
+        return self.extract(source, rect).tobytes() == self.extract(other, rect).tobytes()
+
+    def patch(self, source, other, rect):
+        source.paste(self.extract(other, rect), (rect.x, rect.y))
+
+
+class NumpyBackend(object):
+    """ Frames from a (height, width, channels) numpy array """
+
+    def extract(self, source, rect):
+        return source[rect.y:rect.y + rect.height, rect.x:rect.x + rect.width].copy()
+
+    def unrotate(self, frame):
+        import numpy as np
+        return np.ascontiguousarray(np.rot90(frame, k=-1))
+
+    def scale(self, frame, size):
+        import numpy as np
+        width, height = size
+        rows = np.arange(height) * frame.shape[0] // height
+        columns = np.arange(width) * frame.shape[1] // width
+        return frame[rows][:, columns]
+
+    def flip(self, frame, flip_x, flip_y):
+        import numpy as np
+        if flip_x:
+            frame = frame[:, ::-1]
+        if flip_y:
+            frame = frame[::-1]
+        return np.ascontiguousarray(frame)
+
+    def get_size_bytes(self, frame):
+        return frame.nbytes
+
+    def get_size(self, source):
+        return (source.shape[1], source.shape[0])
+
+    def region_equal(self, source, other, rect):
+        import numpy as np
+        region = (slice(rect.y, rect.y + rect.height), slice(rect.x, rect.x + rect.width))
+        return np.array_equal(source[region], other[region])
+
+    def patch(self, source, other, rect):
+        region = (slice(rect.y, rect.y + rect.height), slice(rect.x, rect.x + rect.width))
+        source[region] = other[region]
+
+
+class PygameBackend(object):
+    """ Frames from a pygame surface """
+
+    def extract(self, source, rect):
+        return source.subsurface(tuple(rect)).copy()
+
+    def unrotate(self, frame):
+        import pygame
+        return pygame.transform.rotate(frame, -90)
+
+    def scale(self, frame, size):
+        import pygame
+        return pygame.transform.scale(frame, size)
+
+    def flip(self, frame, flip_x, flip_y):
+        import pygame
+        return pygame.transform.flip(frame, flip_x, flip_y)
+
+    def get_size_bytes(self, frame):
+        width, height = frame.get_size()
+        return width * height * frame.get_bytesize()
+
+    def get_size(self, source):
+        return source.get_size()
+
+    def region_equal(self, source, other, rect):
+        import pygame
+        return (
+            pygame.image.tostring(source.subsurface(tuple(rect)), "RGBA") ==
+            pygame.image.tostring(other.subsurface(tuple(rect)), "RGBA")
+        )
+
+    def patch(self, source, other, rect):
+        import pygame
+        # Adding to cleared pixels copies them exactly, where a plain blit would blend the alpha
+        source.fill((0, 0, 0, 0), tuple(rect))
+        source.blit(
+            other, (rect.x, rect.y), tuple(rect), special_flags=pygame.BLEND_RGBA_ADD
+        )
+
+
+class FrameCache(object):
+    """ Extracts frames of `components`, a dictionary of `SpriteComponent` by name, from the
+    `source` atlas image.  Frames are kept by component name, scale and flip until the total size
+    of the kept frames exceeds `max_bytes`, at which point the least recently used frames are
+    evicted.  A frame larger than `max_bytes` on its own is returned without being kept.  The
+    frames returned are shared and must not be modified.
+    """
+
+    def __init__(self, source, components, backend=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.source = source
+        self.components = components
+        self.backend = backend or PillowBackend()
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._frames = OrderedDict()
+
+    def get(self, component_name, scale=1, flip_x=False, flip_y=False):
+        key = (component_name, scale, flip_x, flip_y)
+        try:
+            frame, size_bytes = self._frames.pop(key)
+        except KeyError:
+            self.misses += 1
+            frame = self.extract(component_name, scale, flip_x, flip_y)
+            size_bytes = self.backend.get_size_bytes(frame)
+            if size_bytes > self.max_bytes:
+                return frame
+            self.size_bytes += size_bytes
+            self._evict()
+        else:
+            self.hits += 1
+        self._frames[key] = (frame, size_bytes)
+        return frame
+
+    def extract(self, component_name, scale=1, flip_x=False, flip_y=False):
+        """ Extract a new frame from the source, without using the cache """
+        component = self.components[component_name]
+        frame = self.backend.extract(self.source, component.rect)
+        if component.rotated:
+            frame = self.backend.unrotate(frame)
+        if scale != 1:
+            size = (int(round(component.width * scale)), int(round(component.height * scale)))
+            frame = self.backend.scale(frame, size)
+        if flip_x or flip_y:
+            frame = self.backend.flip(frame, flip_x, flip_y)
+        return frame
+
+    def _evict(self):
+        while self.size_bytes > self.max_bytes:
+            _, (_, size_bytes) = self._frames.popitem(last=False)
+            self.size_bytes -= size_bytes
+            self.evictions += 1
+
+    def invalidate(self, component_name=None):
+        """ Drop the frames of a component, or all frames when no name is given """
+        for key in list(self._frames):
+            if component_name is None or key[0] == component_name:
+                _, size_bytes = self._frames.pop(key)
+                self.size_bytes -= size_bytes
+
+    def reload(self, meta, image, component_class=SpriteComponent):
+        """ Reload the atlas from new `meta`, as returned by `Atlas.get_meta`, and its `image`.
+        Components that are still in the meta are updated in place, so references to them stay
+        valid.  Components that were added, moved, or changed in size, rotation or pixels are
+        patched from `image` into the current source, and only their frames are dropped.  If
+        the size of the atlas changed, the source can not be patched and is replaced by `image`.
+        Returns a dictionary of the sorted names that were "added", "removed", "moved" and
+        "changed", and whether the source was "replaced".
+        """
+        replaced = self.backend.get_size(self.source) != self.backend.get_size(image)
+        diff = diff_meta(self.components, meta)
+        for name in diff["removed"]:
+            del self.components[name]
+        changed = []
+        for component_meta in meta:
+            name = component_meta["name"]
+            component = self.components.get(name)
+            if component is None:
+                self.components[name] = component_class.from_meta(component_meta)
+            else:
+                component.__setstate__(component_meta)
+                if replaced or name in diff["moved"]:
+                    continue
+                if not self.backend.region_equal(self.source, image, component.rect):
+                    changed.append(name)
+        diff["changed"] = changed
+        diff["replaced"] = replaced
+        if replaced:
+            self.source = image
+            self.invalidate()
+            return diff
+        for name in diff["added"] + diff["moved"] + changed:
+            self.backend.patch(self.source, image, self.components[name].rect)
+        for name in diff["removed"] + diff["moved"] + changed:
+            self.invalidate(name)
+        return diff
+
+    def get_stats(self):
+        return {
+            "frames": len(self._frames),
+            "size_bytes": self.size_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+def diff_meta(components, meta):
+    """ Compare `components`, a dictionary of `SpriteComponent` by name, with atlas meta.
+    Returns a dictionary of the sorted names that were "added" or "removed", and of those that
+    "moved", meaning their rect or rotation is different.
+    """
+    names = set()
+    added = []
+    moved = []
+    for component_meta in meta:
+        name = component_meta["name"]
+        names.add(name)
+        component = components.get(name)
+        if component is None:
+            added.append(name)
+        elif _get_atlas_state(component.get_meta()) != _get_atlas_state(component_meta):
+            moved.append(name)
+    removed = [name for name in components if name not in names]
+    return {"added": sorted(added), "removed": sorted(removed), "moved": sorted(moved)}
+
+
+def _get_atlas_state(meta):
+    state = dict(meta)
+    state.pop("extra_meta", None)
+    if not state.get("rotated"):
+        state.pop("rotated", None)
+    return state
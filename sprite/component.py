@@ -1,3 +1,6 @@
+from sprite import metrics
+
+
 class Rect(object):
 
     def __init__(self, x, y, width=None, height=None):
@@ -51,6 +54,10 @@ class Rect(object):
 
 
 class SpriteComponent(object):
+    """ An image placed in an atlas.  `width` and `height` are always the dimensions of the image
+    itself.  When `rotated` is set, the image is stored in the atlas rotated 90 degrees
+    counter-clockwise, so its `rect` in the atlas has the width and height swapped.
+    """
 
     @classmethod
     def from_meta(cls, meta):
@@ -66,6 +73,8 @@ class SpriteComponent(object):
         if rect:
             self._width, self._height = rect.width, rect.height
         self._image = image
+        self.rotated = False
+        self.group = None
         self.extra_meta = extra_meta or {}
 
     def __unicode__(self):
@@ -79,6 +88,10 @@ class SpriteComponent(object):
         if self.width is not None:
             state["width"] = self.width
             state["height"] = self.height
+        if self.rotated:
+            state["rotated"] = True
+        if self.group:
+            state["group"] = self.group
         if self.extra_meta:
             state["extra_meta"] = self.extra_meta
         return state
@@ -86,23 +99,39 @@ class SpriteComponent(object):
     def __setstate__(self, state):
         self.name = state['name']
         self._width, self._height = state['width'], state['height']
-        self.set_atlas_position(state['x'], state['y'])
-        if "extra_meta" in state:
-            self.extra_meta = state["extra_meta"]
+        self.set_atlas_position(state['x'], state['y'], rotated=state.get('rotated', False))
+        self.group = state.get("group")
+        self.extra_meta = state.get("extra_meta", {})
 
     def get_meta(self):
         state = self.__getstate__()
         return state
 
-    def set_atlas_position(self, x, y=None):
+    def set_atlas_position(self, x, y=None, rotated=False):
         if y is None:
             x, y = x
-        self._rect = Rect(x, y, self.width, self.height)
+        self.rotated = rotated
+        if rotated:
+            self._rect = Rect(x, y, self.height, self.width)
+        else:
+            self._rect = Rect(x, y, self.width, self.height)
 
     @property
     def rect(self):
         return self._rect
 
+    def get_mip_rect(self, level):
+        """ Return the rect of the component in the given mipmap level of its atlas.  This is
+        exact for levels below the `mip_levels` the atlas was built with.
+        """
+        scale = 2 ** level
+        return Rect(
+            self.rect.x // scale,
+            self.rect.y // scale,
+            -(-self.rect.width // scale),
+            -(-self.rect.height // scale),
+        )
+
     @property
     def width(self):
         if not hasattr(self, "_width") or not self._width:
@@ -129,9 +158,42 @@ class SpriteComponent(object):
     def image(self):
         if not self._image and self.filepath:
             from PIL import Image
-            self._image = Image.open(self.filepath)
+            with metrics.timer("component.image_open"):
+                image = Image.open(self.filepath)
+                image.load()
+            self._image = image
         return self._image
 
     def calc_dimensions(self):
         if self.image:
             self._width, self._height = self.image.size
+
+
+def load_components(meta, component_class=SpriteComponent):
+    """ Return a dictionary of components by name from atlas meta, as returned by
+    `Atlas.get_meta`.
+    """
+    components = {}
+    for component_meta in meta:
+        component = component_class.from_meta(component_meta)
+        components[component.name] = component
+    return components
+
+
+def get_group_rects(components):
+    """ Return the rect of the atlas region of each group by name, from components loaded from
+    atlas meta.  A runtime can use these to load only the regions of the animations it shows.
+    """
+    rects = {}
+    for component in components.values():
+        if component.group:
+            group = component.group
+            rects[group["name"]] = Rect(group["x"], group["y"], group["width"], group["height"])
+    return rects
+
+
+def read_meta(filepath, component_class=SpriteComponent):
+    """ Read an atlas meta JSON file and return a dictionary of its components by name """
+    import json
+    with open(filepath) as f:
+        return load_components(json.load(f), component_class)
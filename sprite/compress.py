@@ -0,0 +1,173 @@
+""" The compress module encodes atlas images into GPU block compressed textures.  Images are
+split into 4x4 blocks which are all encoded at once with numpy:
+
+- BC1 (DXT1) stores 4 bits per pixel, with 1 bit alpha
+- BC3 (DXT5) stores 8 bits per pixel, with interpolated 8 bit alpha
+
+Endpoints are chosen from the bounding box of each block's colors, which is fast and good
+enough for sprite art with few colors per block.  The result is written in a DDS container.
+"""
+
+
+import struct
+import numpy as np
+from sprite.atlas import BLOCK_SIZE, BC1, BC3
+
+
+DDS_MAGIC = b"DDS "
+DDS_HEADER_SIZE = 124
+DDS_PIXELFORMAT_SIZE = 32
+DDSD_CAPS = 0x1
+DDSD_HEIGHT = 0x2
+DDSD_WIDTH = 0x4
+DDSD_PIXELFORMAT = 0x1000
+DDSD_MIPMAPCOUNT = 0x20000
+DDSD_LINEARSIZE = 0x80000
+DDPF_FOURCC = 0x4
+DDSCAPS_COMPLEX = 0x8
+DDSCAPS_TEXTURE = 0x1000
+DDSCAPS_MIPMAP = 0x400000
+FOURCC = {BC1: b"DXT1", BC3: b"DXT5"}
+BLOCK_BYTES = {BC1: 8, BC3: 16}
+ALPHA_THRESHOLD = 128
+
+
+def get_blocks(pixels):
+    """ Split an (height, width, 4) array into an (N, 16, 4) array of 4x4 blocks, in row order.
+    The height and width are padded with transparent pixels up to a multiple of `BLOCK_SIZE`.
+    """
+    height, width = pixels.shape[:2]
+    padded_height = -(-height // BLOCK_SIZE) * BLOCK_SIZE
+    padded_width = -(-width // BLOCK_SIZE) * BLOCK_SIZE
+    if (padded_height, padded_width) != (height, width):
+        padded = np.zeros((padded_height, padded_width, 4), dtype=pixels.dtype)
+        padded[:height, :width] = pixels
+        pixels = padded
+    blocks = pixels.reshape(
+        padded_height // BLOCK_SIZE, BLOCK_SIZE, padded_width // BLOCK_SIZE, BLOCK_SIZE, 4
+    )
+    return blocks.swapaxes(1, 2).reshape(-1, BLOCK_SIZE * BLOCK_SIZE, 4)
+
+
+def _to_565(colors):
+    colors = colors.astype(np.uint32)
+    r = (colors[:, 0] * 31 + 127) // 255
+    g = (colors[:, 1] * 63 + 127) // 255
+    b = (colors[:, 2] * 31 + 127) // 255
+    return (r << 11) | (g << 5) | b
+
+
+def _from_565(values):
+    r = (values >> 11) & 0x1f
+    g = (values >> 5) & 0x3f
+    b = values & 0x1f
+    return np.stack([(r << 3) | (r >> 2), (g << 2) | (g >> 4), (b << 3) | (b >> 2)], axis=1)
+
+
+def _pack_indices(indices, bits):
+    shifts = np.arange(indices.shape[1], dtype=np.uint64) * np.uint64(bits)
+    return np.bitwise_or.reduce(indices.astype(np.uint64) << shifts, axis=1)
+
+
+def _nearest(values, palette):
+    """ Return the index of the nearest palette entry for each value.  `values` has shape
+    (N, 16, C) and `palette` has shape (N, P, C).
+    """
+    distances = ((values[:, :, None, :] - palette[:, None, :, :]) ** 2).sum(axis=3)
+    return distances.argmin(axis=2)
+
+
+def encode_color_blocks(blocks, punch_through=False):
+    """ Encode the colors of (N, 16, 4) blocks as BC1 color blocks, returned as an (N, 8) uint8
+    array.  With `punch_through`, blocks containing pixels with alpha below `ALPHA_THRESHOLD` use
+    the three color mode, where those pixels are encoded as transparent.
+    """
+    count = blocks.shape[0]
+    rgb = blocks[:, :, :3]
+    c0 = _to_565(rgb.max(axis=1))
+    c1 = _to_565(rgb.min(axis=1))
+    transparent = np.zeros((count, 16), dtype=bool)
+    three_color = np.zeros(count, dtype=bool)
+    if punch_through:
+        transparent = blocks[:, :, 3] < ALPHA_THRESHOLD
+        three_color = transparent.any(axis=1)
+        c0, c1 = np.where(three_color, c1, c0), np.where(three_color, c0, c1)
+    e0 = _from_565(c0).astype(np.int32)
+    e1 = _from_565(c1).astype(np.int32)
+    four_palette = np.stack([e0, e1, (2 * e0 + e1) // 3, (e0 + 2 * e1) // 3], axis=1)
+    three_palette = np.stack([e0, e1, (e0 + e1) // 2, (e0 + e1) // 2], axis=1)
+    palette = np.where(three_color[:, None, None], three_palette, four_palette)
+    indices = _nearest(rgb.astype(np.int32), palette)
+    indices[transparent] = 3
+    output = np.empty(count, dtype=[("c0", "<u2"), ("c1", "<u2"), ("indices", "<u4")])
+    output["c0"] = c0
+    output["c1"] = c1
+    output["indices"] = _pack_indices(indices, 2)
+    return output.view(np.uint8).reshape(count, 8)
+
+
+def encode_alpha_blocks(blocks):
+    """ Encode the alpha of (N, 16, 4) blocks as BC3 alpha blocks, returned as an (N, 8) uint8
+    array.  The eight value interpolation mode is always used.
+    """
+    count = blocks.shape[0]
+    alpha = blocks[:, :, 3].astype(np.int32)
+    a0 = alpha.max(axis=1)
+    a1 = alpha.min(axis=1)
+    weights = np.array([7, 0, 6, 5, 4, 3, 2, 1])
+    palette = (weights * a0[:, None] + (7 - weights) * a1[:, None] + 3) // 7
+    indices = _nearest(alpha[:, :, None], palette[:, :, None])
+    output = np.empty((count, 8), dtype=np.uint8)
+    output[:, 0] = a0
+    output[:, 1] = a1
+    packed = _pack_indices(indices, 3).astype("<u8")
+    output[:, 2:] = packed.view(np.uint8).reshape(count, 8)[:, :6]
+    return output
+
+
+def encode(image, codec):
+    """ Return the block compressed bytes of a PIL image """
+    blocks = get_blocks(np.asarray(image.convert("RGBA")))
+    if codec == BC1:
+        encoded = encode_color_blocks(blocks, punch_through=True)
+    elif codec == BC3:
+        encoded = np.concatenate(
+            [encode_alpha_blocks(blocks), encode_color_blocks(blocks)], axis=1
+        )
+    else:
+        raise ValueError("Unknown block compression codec '{0}'".format(codec))
+    return encoded.tobytes()
+
+
+def get_dds_header(width, height, codec, mip_count=1):
+    flags = DDSD_CAPS | DDSD_HEIGHT | DDSD_WIDTH | DDSD_PIXELFORMAT | DDSD_LINEARSIZE
+    caps = DDSCAPS_TEXTURE
+    if mip_count > 1:
+        flags |= DDSD_MIPMAPCOUNT
+        caps |= DDSCAPS_COMPLEX | DDSCAPS_MIPMAP
+    linear_size = (
+        max(1, -(-width // BLOCK_SIZE)) * max(1, -(-height // BLOCK_SIZE)) * BLOCK_BYTES[codec]
+    )
+    return b"".join([
+        DDS_MAGIC,
+        struct.pack(
+            "<7I44x", DDS_HEADER_SIZE, flags, height, width, linear_size, 0, mip_count
+        ),
+        struct.pack("<2I4s5I", DDS_PIXELFORMAT_SIZE, DDPF_FOURCC, FOURCC[codec], 0, 0, 0, 0, 0),
+        struct.pack("<5I", caps, 0, 0, 0, 0),
+    ])
+
+
+def write_dds(filepath, images, codec=BC3):
+    """ Write PIL images to a DDS file as a block compressed texture.  The first image is the
+    texture, and any others are its mipmaps in order of decreasing size.  `filepath` may also be
+    a file object.
+    """
+    width, height = images[0].size
+    data = [get_dds_header(width, height, codec, len(images))]
+    data.extend(encode(image, codec) for image in images)
+    if hasattr(filepath, "write"):
+        filepath.write(b"".join(data))
+    else:
+        with open(filepath, "wb") as f:
+            f.write(b"".join(data))
@@ -0,0 +1,116 @@
+""" The culling module keeps animation players in a uniform grid by the area their animations can
+cover, so that only the players within a viewport update their renderers.
+"""
+
+
+from math import floor
+
+
+DEFAULT_CELL_SIZE = 256
+
+
+def get_animation_bounds(animation):
+    """ Return the (min_x, min_y, max_x, max_y) that an animation covers throughout its stages,
+    relative to the position it is drawn at.  The stages need their components set, see
+    `SpriteAnimation.set_components`.
+    """
+    return (animation.min_x, animation.min_y, animation.max_x, animation.max_y)
+
+
+class CullingGrid(object):
+    """ A uniform grid of square cells of `cell_size`, holding animation players by the bounds of
+    their animation at their position.  The bounds are conservative, so a player outside a
+    viewport can not draw anything inside it at any stage of its animation.
+    """
+
+    def __init__(self, cell_size=DEFAULT_CELL_SIZE):
+        self.cell_size = cell_size
+        self._cells = {}
+        self._bounds = {}
+        self._player_cells = {}
+        self._animation_bounds = {}
+        self._visible = set()
+
+    def _get_cells(self, bounds):
+        min_x, min_y, max_x, max_y = bounds
+        x1, y1 = int(floor(min_x / self.cell_size)), int(floor(min_y / self.cell_size))
+        x2, y2 = int(floor(max_x / self.cell_size)), int(floor(max_y / self.cell_size))
+        return [(x, y) for x in range(x1, x2 + 1) for y in range(y1, y2 + 1)]
+
+    def get_bounds(self, player, x, y):
+        """ Return the bounds of a player at a position, caching the bounds of each animation.
+        When the renderer of the player has a `scale`, `flip_x` or `flip_y`, as `AtlasRenderer`
+        does, the bounds are scaled and mirrored as it draws them.
+        """
+        animation = player.animation
+        key = id(animation)
+        if key not in self._animation_bounds:
+            self._animation_bounds[key] = (animation, get_animation_bounds(animation))
+        min_x, min_y, max_x, max_y = self._animation_bounds[key][1]
+        renderer = player.renderer
+        if getattr(renderer, "flip_x", False):
+            min_x, max_x = -max_x, -min_x
+        if getattr(renderer, "flip_y", False):
+            min_y, max_y = -max_y, -min_y
+        scale = getattr(renderer, "scale", 1)
+        return (x + min_x * scale, y + min_y * scale, x + max_x * scale, y + max_y * scale)
+
+    def insert(self, player, x, y):
+        """ Add a player drawn at a position, or move it if it is already in the grid """
+        bounds = self.get_bounds(player, x, y)
+        cells = self._get_cells(bounds)
+        old_cells = self._player_cells.get(player)
+        if old_cells is None and player.visible:
+            self._visible.add(player)
+        if old_cells != cells:
+            if old_cells:
+                self._remove_from_cells(player, old_cells)
+            for cell in cells:
+                self._cells.setdefault(cell, set()).add(player)
+            self._player_cells[player] = cells
+        self._bounds[player] = bounds
+
+    move = insert
+
+    def _remove_from_cells(self, player, cells):
+        for cell in cells:
+            players = self._cells[cell]
+            players.discard(player)
+            if not players:
+                del self._cells[cell]
+
+    def remove(self, player):
+        self._remove_from_cells(player, self._player_cells.pop(player))
+        del self._bounds[player]
+        self._visible.discard(player)
+
+    def clear_animation_bounds(self):
+        """ Forget the cached animation bounds, after animations or their components change """
+        self._animation_bounds = {}
+
+    def query(self, viewport):
+        """ Return the set of players whose bounds intersect a viewport (x, y, width, height) """
+        x, y, width, height = viewport
+        view = (x, y, x + width, y + height)
+        found = set()
+        for cell in self._get_cells(view):
+            for player in self._cells.get(cell, ()):
+                if player in found:
+                    continue
+                min_x, min_y, max_x, max_y = self._bounds[player]
+                if min_x < view[2] and max_x > view[0] and min_y < view[3] and max_y > view[1]:
+                    found.add(player)
+        return found
+
+    def cull(self, viewport):
+        """ Make the players in a viewport visible and all the others hidden, see
+        `SpriteAnimationPlayer.set_visible`.  Only players whose visibility changed since the last
+        call are updated.  Returns the set of visible players.
+        """
+        visible = self.query(viewport)
+        for player in self._visible - visible:
+            player.set_visible(False)
+        for player in visible - self._visible:
+            player.set_visible(True)
+        self._visible = visible
+        return visible
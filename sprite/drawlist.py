@@ -0,0 +1,131 @@
+""" The drawlist module collects the current frame of many animated sprites into one sorted list
+of draw commands, so that frames drawn from the same atlas page are drawn together and can be
+submitted in a single call, such as pygame's `Surface.blits` or an instanced GPU draw.
+"""
+
+
+from array import array
+from sprite.component import Rect
+
+
+FLIP_X = 1
+FLIP_Y = 2
+ROTATED = 4
+
+
+class AtlasRenderer(object):
+    """ A renderer for `SpriteAnimationPlayer` that records the frame to draw instead of drawing
+    it.  `components` is a dictionary of `SpriteComponent` by name, as placed on the atlas
+    `page`.  As in the samples, the center of the component is drawn at the position plus the
+    stage displacement, all multiplied by `scale`.  Flipping horizontally or vertically also
+    mirrors the displacement.
+    """
+
+    def __init__(self, components, page=0, position=None, z=0, scale=1, flip_x=False,
+                 flip_y=False):
+        self.components = components
+        self.page = page
+        self.position_x, self.position_y = position or (0, 0)
+        self.z = z
+        self.scale = scale
+        self.flip_x = flip_x
+        self.flip_y = flip_y
+        self.visible = True
+        self.component = None
+        self.displacement_x, self.displacement_y = (0, 0)
+
+    def set_component(self, component_name, **params):
+        self.component = self.components[component_name]
+        self.displacement_x = params.get("displacement_x", 0)
+        self.displacement_y = params.get("displacement_y", 0)
+
+    def set_position(self, x, y=None):
+        if y is None:
+            x, y = x
+        self.position_x, self.position_y = x, y
+
+    def get_flags(self):
+        flags = 0
+        if self.flip_x:
+            flags |= FLIP_X
+        if self.flip_y:
+            flags |= FLIP_Y
+        if self.component.rotated:
+            flags |= ROTATED
+        return flags
+
+    def get_dst_rect(self):
+        width = int(round(self.component.width * self.scale))
+        height = int(round(self.component.height * self.scale))
+        displacement_x = -self.displacement_x if self.flip_x else self.displacement_x
+        displacement_y = -self.displacement_y if self.flip_y else self.displacement_y
+        x = self.position_x + (displacement_x * self.scale) - width / 2.0
+        y = self.position_y + (displacement_y * self.scale) - height / 2.0
+        return Rect(int(round(x)), int(round(y)), width, height)
+
+
+class DrawList(object):
+    """ The frames of a set of renderers in draw order.  Frames are sorted by `z` and, within
+    each z, by page, so that layering is kept and frames from the same page are contiguous.
+    Per frame, the packed arrays hold:
+
+    - `pages`: the page of the frame
+    - `src_rects`: the x, y, width and height of the component on its page
+    - `dst_rects`: the x, y, width and height to draw the frame at
+    - `flags`: a combination of `FLIP_X`, `FLIP_Y` and `ROTATED`
+    """
+
+    def __init__(self):
+        self.names = []
+        self.scales = []
+        self.pages = array("i")
+        self.src_rects = array("i")
+        self.dst_rects = array("i")
+        self.flags = array("B")
+
+    @classmethod
+    def build(cls, renderers):
+        """ Build the draw list of the visible renderers that have a component set """
+        draw_list = cls()
+        renderers = [r for r in renderers if r.visible and r.component is not None]
+        renderers.sort(key=lambda r: (r.z, r.page))
+        for renderer in renderers:
+            draw_list.add(renderer)
+        return draw_list
+
+    def add(self, renderer):
+        self.names.append(renderer.component.name)
+        self.scales.append(renderer.scale)
+        self.pages.append(renderer.page)
+        self.src_rects.extend(renderer.component.rect)
+        self.dst_rects.extend(renderer.get_dst_rect())
+        self.flags.append(renderer.get_flags())
+
+    def __len__(self):
+        return len(self.pages)
+
+    def get_page_switches(self):
+        """ Return the number of times consecutive frames are drawn from different pages """
+        return sum(1 for i in range(1, len(self.pages)) if self.pages[i] != self.pages[i - 1])
+
+    def get_blits(self, surfaces, frame_caches=None):
+        """ Return a list of (source, dst position[, src area]) tuples for pygame's `Surface.blits`.
+        `surfaces` maps each page to its surface.  Frames that are scaled, flipped or rotated can
+        not be drawn straight from the page, and are taken from `frame_caches`, which maps each
+        page to a `sprite.cache.FrameCache` of it.
+        """
+        blits = []
+        for i, page in enumerate(self.pages):
+            src = tuple(self.src_rects[i * 4:i * 4 + 4])
+            dst = tuple(self.dst_rects[i * 4:i * 4 + 2])
+            flags = self.flags[i]
+            scale = self.scales[i]
+            if scale == 1 and not flags:
+                blits.append((surfaces[page], dst, src))
+            else:
+                frame = frame_caches[page].get(
+                    self.names[i], scale=scale, flip_x=bool(flags & FLIP_X),
+                    flip_y=bool(flags & FLIP_Y)
+                )
+                blits.append((frame, dst))
+        return blits
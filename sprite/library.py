@@ -0,0 +1,236 @@
+""" The library module stores a large set of animations compactly.  Animations often repeat the
+same stages, such as the same durations and displacements across every direction of an action,
+so each distinct stage is stored once in a shared table, and each distinct sequence of stages is
+stored once as indexes into that table.  The table and sequences are packed arrays, so loading a
+library does not create an object per stage; stage objects are only created, once per distinct
+stage, when an animation is taken from the library.
+"""
+
+
+from array import array
+from sprite.animation import SpriteAnimation, SpriteAnimationStage, normalize_events
+
+
+LIBRARY_VERSION = 1
+
+
+def _to_array(typecode, values):
+    if isinstance(values, array) and values.typecode == typecode:
+        return values
+    return array(typecode, values)
+
+
+class AnimationLibrary(object):
+    """ Distinct stages and sequences shared by a set of animations.  Per distinct stage, the
+    arrays hold:
+
+    - `stage_components`: the index of the component name in `component_names`
+    - `stage_durations`: the duration of the stage in seconds
+    - `stage_displacements`: the displacement_x and displacement_y of the stage
+
+    `stage_events` holds the events of the stages that have any, as a tuple of (time, name)
+    tuples by stage index.  The stage indexes of sequence `i` are
+    `sequence_stages[sequence_starts[i]:sequence_starts[i + 1]]`, and `animations` holds the
+    sequence index of each animation by name.
+    """
+
+    def __init__(self):
+        self.component_names = []
+        self.stage_components = array("I")
+        self.stage_durations = array("d")
+        self.stage_displacements = array("d")
+        self.stage_events = {}
+        self.sequence_starts = array("I", [0])
+        self.sequence_stages = array("I")
+        self.animations = {}
+        self._component_indexes = None
+        self._stage_indexes = None
+        self._sequence_indexes = None
+        self._stages = {}
+
+    @classmethod
+    def load(cls, state):
+        library = cls.__new__(cls)
+        library.__setstate__(state)
+        return library
+
+    @classmethod
+    def from_animations(cls, animations):
+        library = cls()
+        for animation in animations:
+            library.add_animation(animation)
+        return library
+
+    def __getstate__(self):
+        """ Return the library with its arrays as is, which pickle stores as raw bytes """
+        event_stages = sorted(self.stage_events)
+        return {
+            "version": LIBRARY_VERSION,
+            "component_names": list(self.component_names),
+            "stage_components": self.stage_components,
+            "stage_durations": self.stage_durations,
+            "stage_displacements": self.stage_displacements,
+            "event_stages": event_stages,
+            "events": [
+                [list(event) for event in self.stage_events[i]] for i in event_stages
+            ],
+            "sequence_starts": self.sequence_starts,
+            "sequence_stages": self.sequence_stages,
+            "animations": dict(self.animations),
+        }
+
+    def get_data(self):
+        """ Return the library with its arrays as lists, for JSON or YAML.  Either form can be
+        given to `load`.
+        """
+        data = self.__getstate__()
+        for key, value in data.items():
+            if isinstance(value, array):
+                data[key] = value.tolist()
+        return data
+
+    def __setstate__(self, state):
+        if state.get("version") != LIBRARY_VERSION:
+            raise ValueError(
+                "Unsupported animation library version {0}".format(state.get("version"))
+            )
+        self.component_names = list(state["component_names"])
+        self.stage_components = _to_array("I", state["stage_components"])
+        self.stage_durations = _to_array("d", state["stage_durations"])
+        self.stage_displacements = _to_array("d", state["stage_displacements"])
+        self.stage_events = dict(
+            (i, tuple((time, name) for time, name in events))
+            for i, events in zip(state["event_stages"], state["events"])
+        )
+        self.sequence_starts = _to_array("I", state["sequence_starts"])
+        self.sequence_stages = _to_array("I", state["sequence_stages"])
+        self.animations = dict(state["animations"])
+        self._component_indexes = None
+        self._stage_indexes = None
+        self._sequence_indexes = None
+        self._stages = {}
+
+    def _build_indexes(self):
+        """ Build the lookups used to intern stages and sequences, which are not kept in the
+        serialized form so that loading a library stays cheap.
+        """
+        self._component_indexes = dict(
+            (name, i) for i, name in enumerate(self.component_names)
+        )
+        self._stage_indexes = {}
+        for i in range(len(self.stage_durations)):
+            self._stage_indexes[self._get_stage_key(i)] = i
+        self._sequence_indexes = {}
+        for i in range(len(self.sequence_starts) - 1):
+            self._sequence_indexes[tuple(self.get_sequence(i))] = i
+
+    def _get_stage_key(self, index):
+        return (
+            self.stage_components[index],
+            self.stage_durations[index],
+            self.stage_displacements[index * 2],
+            self.stage_displacements[index * 2 + 1],
+            self.stage_events.get(index, ()),
+        )
+
+    def _intern_stage(self, state):
+        component_name = state["component_name"]
+        component_index = self._component_indexes.get(component_name)
+        if component_index is None:
+            component_index = len(self.component_names)
+            self.component_names.append(component_name)
+            self._component_indexes[component_name] = component_index
+        duration = state["duration"]
+        events = tuple(normalize_events(state.get("events", ()), duration))
+        key = (
+            component_index,
+            float(duration),
+            float(state.get("displacement_x", 0)),
+            float(state.get("displacement_y", 0)),
+            events,
+        )
+        index = self._stage_indexes.get(key)
+        if index is None:
+            index = len(self.stage_durations)
+            self.stage_components.append(component_index)
+            self.stage_durations.append(key[1])
+            self.stage_displacements.extend(key[2:4])
+            if events:
+                self.stage_events[index] = events
+            self._stage_indexes[key] = index
+        return index
+
+    def add_animation_data(self, name, stages):
+        """ Add an animation from its stages as dictionaries, as in an animation file """
+        if name in self.animations:
+            raise KeyError("Animation with name '{0}' already exists".format(name))
+        if self._stage_indexes is None:
+            self._build_indexes()
+        sequence = tuple(self._intern_stage(stage) for stage in stages)
+        index = self._sequence_indexes.get(sequence)
+        if index is None:
+            index = len(self.sequence_starts) - 1
+            self.sequence_stages.extend(sequence)
+            self.sequence_starts.append(len(self.sequence_stages))
+            self._sequence_indexes[sequence] = index
+        self.animations[name] = index
+
+    def add_animation(self, animation):
+        self.add_animation_data(
+            animation.name, [stage.__getstate__() for stage in animation.stages]
+        )
+
+    def get_sequence(self, index):
+        return self.sequence_stages[self.sequence_starts[index]:self.sequence_starts[index + 1]]
+
+    def get_stage(self, index):
+        """ Return the stage object of a distinct stage.  It is created on first use and then
+        shared by every animation that uses the stage, so it must not be modified, other than
+        setting its component.
+        """
+        stage = self._stages.get(index)
+        if stage is None:
+            stage = SpriteAnimationStage(
+                self.component_names[self.stage_components[index]],
+                self.stage_durations[index],
+                displacement_x=self.stage_displacements[index * 2],
+                displacement_y=self.stage_displacements[index * 2 + 1],
+                events=[
+                    {"name": name, "time": time}
+                    for time, name in self.stage_events.get(index, ())
+                ],
+            )
+            self._stages[index] = stage
+        return stage
+
+    def get_animation(self, name, animation_class=SpriteAnimation):
+        """ Return an animation from the library, made of shared stage objects """
+        stages = [self.get_stage(i) for i in self.get_sequence(self.animations[name])]
+        return animation_class(name, stages)
+
+    def get_animations(self, animation_class=SpriteAnimation):
+        """ Return a dictionary of all the animations in the library by name """
+        return dict(
+            (name, self.get_animation(name, animation_class)) for name in self.animations
+        )
+
+    def get_stats(self):
+        return {
+            "animations": len(self.animations),
+            "sequences": len(self.sequence_starts) - 1,
+            "stages": len(self.stage_durations),
+            "stage_references": sum(
+                self.sequence_starts[i + 1] - self.sequence_starts[i]
+                for i in self.animations.values()
+            ),
+        }
+
+
+def build_animation_library(data):
+    """ Build a library from the raw data of an animation file, see
+    `sprite.animation.load_animation_data`, without creating any stage objects.
+    """
+    library = AnimationLibrary()
+    for animation_data in data["animations"]:
+        library.add_animation_data(animation_data["name"], animation_data["stages"])
+    return library
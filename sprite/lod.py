@@ -0,0 +1,76 @@
+""" The lod module advances animation players at reduced rates by level of detail, so that the
+cost of each frame depends on the number of players that need full precision, such as those on
+screen, rather than on the total number of players.
+"""
+
+
+from sprite.animation import ZERO_TIME
+
+
+DEFAULT_TIER_INTERVALS = (1, 4, 16)
+
+
+class _Tier(object):
+
+    def __init__(self, interval, zero_time):
+        self.interval = interval
+        self.accumulated = zero_time
+        self.players = {}
+
+
+class LODScheduler(object):
+    """ Groups players into tiers, where tier `i` is advanced every `tier_intervals[i]` ticks with
+    the time accumulated since it was last advanced.  Since the players carry time over between
+    stages, a player that is advanced late ends up in the same stage, and executes the same
+    events and hooks with the same `extra_time`, as if it had been advanced every tick; only the
+    renderer updates and callbacks happen later.  `zero_time` must match the time unit of the
+    players, e.g. 0 for `TickAnimationPlayer`.
+    """
+
+    def __init__(self, tier_intervals=DEFAULT_TIER_INTERVALS, zero_time=ZERO_TIME):
+        self.zero_time = zero_time
+        self.tiers = [_Tier(interval, zero_time) for interval in tier_intervals]
+        self.player_tiers = {}
+        self.tick_count = 0
+
+    def add(self, player, tier=0):
+        """ Add a player to a tier.  The player only receives time that passes after it is added.
+        """
+        self.tiers[tier].players[player] = self.tiers[tier].accumulated
+        self.player_tiers[player] = tier
+
+    def remove(self, player):
+        """ Remove a player, first advancing it with the time it is owed """
+        self.flush(player)
+        tier = self.player_tiers.pop(player)
+        del self.tiers[tier].players[player]
+
+    def flush(self, player):
+        """ Advance a player with the time accumulated in its tier since it was last advanced """
+        tier = self.tiers[self.player_tiers[player]]
+        owed = tier.accumulated - tier.players[player]
+        tier.players[player] = tier.accumulated
+        if owed > self.zero_time:
+            player.pass_animation_time(owed)
+
+    def set_tier(self, player, tier):
+        """ Move a player to another tier.  The player is caught up first, so that it is up to
+        date when promoted to a tier that is advanced more often.
+        """
+        if self.player_tiers[player] == tier:
+            return
+        self.remove(player)
+        self.add(player, tier)
+
+    def tick(self, time):
+        """ Pass time for all the players, advancing the tiers that are due this tick """
+        self.tick_count += 1
+        for tier in self.tiers:
+            tier.accumulated += time
+            if self.tick_count % tier.interval == 0:
+                for player in list(tier.players):
+                    if player in tier.players:
+                        self.flush(player)
+                tier.accumulated = self.zero_time
+                for player in tier.players:
+                    tier.players[player] = self.zero_time
@@ -0,0 +1,101 @@
+""" The metrics module records counters and timers from inside the sprite package, such as how
+many times an atlas was re-packed or how many stage transitions players made.  Recording is off
+by default, and while it is off every recording site is skipped behind a check of `ENABLED`.
+
+Counters and timers are kept in memory and returned by `get_snapshot`, and can be recorded from
+several threads at once.  A sink can also be given to `enable`, which is called with
+`(kind, name, value)` for every record, where kind is COUNTER or TIMER, to forward metrics to
+other telemetry.
+"""
+
+
+import threading
+import time
+
+
+COUNTER = "counter"
+TIMER = "timer"
+ENABLED = False
+_sink = None
+_counters = {}
+_timers = {}
+_lock = threading.Lock()
+
+
+def enable(sink=None):
+    global ENABLED, _sink
+    _sink = sink
+    ENABLED = True
+
+
+def disable():
+    global ENABLED, _sink
+    ENABLED = False
+    _sink = None
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _timers.clear()
+
+
+def incr(name, value=1):
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+    if _sink is not None:
+        _sink(COUNTER, name, value)
+
+
+def add_time(name, seconds):
+    with _lock:
+        count, total = _timers.get(name, (0, 0.0))
+        _timers[name] = (count + 1, total + seconds)
+    if _sink is not None:
+        _sink(TIMER, name, seconds)
+
+
+class _Timer(object):
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        add_time(self.name, time.perf_counter() - self.start)
+
+
+class _NullTimer(object):
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timer(name):
+    """ Return a context manager that records the time spent in it, or does nothing when
+    recording is off.
+    """
+    if ENABLED:
+        return _Timer(name)
+    return _NULL_TIMER
+
+
+def get_snapshot():
+    """ Return the recorded counters, and the count and total seconds of each timer """
+    with _lock:
+        return {
+            "counters": dict(_counters),
+            "timers": dict(
+                (name, {"count": count, "seconds": total})
+                for name, (count, total) in _timers.items()
+            ),
+        }
@@ -0,0 +1,164 @@
+""" The residency module loads atlas pages in the background and keeps the loaded pages within a
+memory budget, so that a game loop can stream atlases in without blocking on file reads and
+image decoding.
+"""
+
+
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+LOG = logging.getLogger(__name__)
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_WORKERS = 2
+
+
+def load_pillow_page(path):
+    """ Read and decode an atlas image with Pillow """
+    from PIL import Image
+    image = Image.open(path)
+    image.load()
+    return image
+
+
+def get_pillow_size_bytes(image):
+    return image.width * image.height * len(image.getbands())
+
+
+class _Page(object):
+
+    def __init__(self):
+        self.future = None
+        self.loaded = False
+        self.references = 0
+        self.size_bytes = 0
+
+
+class AtlasPageManager(object):
+    """ Loads atlas pages with `loader(path)` in a pool of `workers` threads.  Pages in use are
+    reference counted with `acquire` and `release`.  Once the loaded pages take up more than
+    `max_bytes`, as measured by `get_size_bytes(page)`, the least recently used pages that are not
+    in use are evicted.  Pages that are in use or still loading are never evicted, so the budget
+    can be exceeded while they are.
+    """
+
+    def __init__(self, loader=load_pillow_page, get_size_bytes=get_pillow_size_bytes,
+                 max_bytes=DEFAULT_MAX_BYTES, workers=DEFAULT_WORKERS):
+        self.loader = loader
+        self.get_size_bytes = get_size_bytes
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self.evictions = 0
+        self._pages = OrderedDict()
+        self._failed_references = {}
+        self._lock = threading.RLock()
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+
+    def _get_page(self, path):
+        page = self._pages.get(path)
+        if page is None:
+            page = _Page()
+            self._pages[path] = page
+            page.future = self._executor.submit(self._load, path, page)
+        else:
+            self._pages.move_to_end(path)
+        return page
+
+    def _load(self, path, page):
+        try:
+            data = self.loader(path)
+        except Exception as e:
+            LOG.error("Unable to load atlas page '%s': %s", path, e)
+            with self._lock:
+                if self._pages.get(path) is page:
+                    del self._pages[path]
+                    # Keep the references so the holders can still release them
+                    if page.references:
+                        self._failed_references[path] = (
+                            self._failed_references.get(path, 0) + page.references
+                        )
+            raise
+        with self._lock:
+            page.size_bytes = self.get_size_bytes(data)
+            page.loaded = True
+            self.size_bytes += page.size_bytes
+            self._evict()
+        return data
+
+    def _evict(self):
+        for path in list(self._pages):
+            if self.size_bytes <= self.max_bytes:
+                break
+            page = self._pages[path]
+            if page.references or not page.loaded:
+                continue
+            del self._pages[path]
+            self.size_bytes -= page.size_bytes
+            self.evictions += 1
+
+    def prefetch(self, path):
+        """ Start loading a page if it is not loaded, without acquiring it.  Returns a future of
+        the page.  A prefetched page that is not acquired may be evicted.
+        """
+        with self._lock:
+            return self._get_page(path).future
+
+    def acquire(self, path):
+        """ Load a page if it is not loaded, and keep it loaded until it is released.  Returns a
+        future of the page.
+        """
+        with self._lock:
+            page = self._get_page(path)
+            page.references += 1
+            return page.future
+
+    def acquire_async(self, path):
+        """ Acquire a page and return an awaitable of it, for use in an asyncio event loop """
+        import asyncio
+        return asyncio.wrap_future(self.acquire(path))
+
+    def release(self, path):
+        """ Release a page acquired with `acquire`.  This is also done for a page that failed to
+        load, which is removed so that acquiring it again retries the load.
+        """
+        with self._lock:
+            failed = self._failed_references.get(path)
+            if failed:
+                if failed == 1:
+                    del self._failed_references[path]
+                else:
+                    self._failed_references[path] = failed - 1
+                return
+            page = self._pages.get(path)
+            if page is None or page.references <= 0:
+                raise ValueError("Atlas page '{0}' is not acquired".format(path))
+            page.references -= 1
+            self._evict()
+
+    def get(self, path):
+        """ Return a page if it is loaded, otherwise None.  This never blocks. """
+        with self._lock:
+            page = self._pages.get(path)
+            if page is None or not page.future.done():
+                return None
+            self._pages.move_to_end(path)
+            return page.future.result()
+
+    def is_loaded(self, path):
+        return self.get(path) is not None
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                "pages": len(self._pages),
+                "loading": sum(1 for page in self._pages.values() if not page.loaded),
+                "in_use": sum(1 for page in self._pages.values() if page.references),
+                "size_bytes": self.size_bytes,
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions,
+            }
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
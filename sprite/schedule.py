@@ -0,0 +1,108 @@
+""" The schedule module flattens animations and the atlas they are drawn from into packed arrays,
+so that the current frame of many animation instances can be computed outside of python objects,
+for example in a shader or a vectorized batch.
+"""
+
+
+from array import array
+from bisect import bisect_right
+
+
+MICROSECONDS = 1000000
+
+
+class FrameSchedule(object):
+    """ Packed frame data for a set of animations.  Stages of all the animations are stored one
+    after the other, and `animation_starts[i]` is the index of the first stage of animation `i`
+    (the final entry is the total number of stages).  Per stage, the arrays hold:
+
+    - `stage_ends`: the time in seconds at which the stage ends, from the start of its animation.
+      Durations are summed in whole microseconds, as `SpriteAnimationPlayer` does with
+      timedeltas, and stored as float64 so that the ends match the player exactly.  A float32
+      copy can be a stage off at the boundaries.
+    - `rects`: the x, y, width and height of the component in the atlas, in pixels
+    - `uv_rects`: the same rect divided by the atlas size
+    - `displacements`: the displacement_x and displacement_y of the stage
+    - `rotated`: 1 if the component is stored rotated in the atlas, otherwise 0
+
+    Each array can be uploaded as is with `tobytes`, or wrapped with `numpy.frombuffer`.
+    """
+
+    def __init__(self, names, animation_starts, stage_ends, rects, uv_rects, displacements,
+                 rotated):
+        self.names = names
+        self.animation_starts = animation_starts
+        self.stage_ends = stage_ends
+        self.rects = rects
+        self.uv_rects = uv_rects
+        self.displacements = displacements
+        self.rotated = rotated
+        self._indexes = dict((name, i) for i, name in enumerate(names))
+
+    @classmethod
+    def build(cls, animations, components, atlas_size):
+        """ Build the schedule of `animations`, taking component rects from `components`, a
+        dictionary of `SpriteComponent` by name with their atlas positions set.
+        """
+        atlas_width, atlas_height = atlas_size
+        names = []
+        animation_starts = array("I", [0])
+        stage_ends = array("d")
+        rects = array("i")
+        uv_rects = array("f")
+        displacements = array("f")
+        rotated = array("B")
+        for animation in animations:
+            names.append(animation.name)
+            end = 0
+            for stage in animation.stages:
+                end += int(round(stage.duration * MICROSECONDS))
+                stage_ends.append(end / float(MICROSECONDS))
+                component = components[stage.component_name]
+                rect = component.rect
+                rects.extend(rect)
+                uv_rects.extend([
+                    float(rect.x) / atlas_width,
+                    float(rect.y) / atlas_height,
+                    float(rect.width) / atlas_width,
+                    float(rect.height) / atlas_height,
+                ])
+                displacements.extend([stage.displacement_x, stage.displacement_y])
+                rotated.append(1 if component.rotated else 0)
+            animation_starts.append(len(stage_ends))
+        return cls(names, animation_starts, stage_ends, rects, uv_rects, displacements, rotated)
+
+    def get_animation_index(self, name):
+        return self._indexes[name]
+
+    def get_duration(self, animation_index):
+        start, end = self.animation_starts[animation_index:animation_index + 2]
+        if start == end:
+            return 0.0
+        return self.stage_ends[end - 1]
+
+    def get_stage_index(self, animation_index, time, loop=False):
+        """ Return the index, into the per-stage arrays, of the stage of an animation playing at
+        `time` seconds from its start.  None is returned once a non-looping animation is complete.
+        This is the reference for what a batch or shader implementation should compute, and
+        matches the stage a `SpriteAnimationPlayer` is in after the same time has passed.
+        """
+        start, end = self.animation_starts[animation_index:animation_index + 2]
+        duration = self.get_duration(animation_index)
+        if loop and duration:
+            time = time % duration
+        index = bisect_right(self.stage_ends, time, start, end)
+        if index == end:
+            return None
+        return index
+
+    def get_buffers(self):
+        """ Return a dictionary of the packed arrays by name """
+        return {
+            "animation_starts": self.animation_starts,
+            "stage_ends": self.stage_ends,
+            "rects": self.rects,
+            "uv_rects": self.uv_rects,
+            "displacements": self.displacements,
+            "rotated": self.rotated,
+        }
@@ -0,0 +1,128 @@
+""" The sheet module slices components out of existing spritesheets in memory, so that a sheet can
+be packed into an atlas without first writing each of its images to its own file.  Each sheet is
+decoded once, the first time any of its components needs pixels, and each component crops its
+region from it the first time its image is used.
+"""
+
+
+import threading
+from sprite import metrics
+from sprite.component import SpriteComponent, Rect
+
+
+DEFAULT_NAME_TEMPLATE = "{index}"
+
+
+class Spritesheet(object):
+    """ A sheet image, read from `filepath` or given as a PIL `image` """
+
+    def __init__(self, filepath=None, image=None):
+        self.filepath = filepath
+        self._image = image
+        self._lock = threading.Lock()
+
+    @property
+    def image(self):
+        with self._lock:
+            if self._image is None:
+                from PIL import Image
+                with metrics.timer("sheet.image_open"):
+                    image = Image.open(self.filepath)
+                    image.load()
+                self._image = image
+        return self._image
+
+    @property
+    def size(self):
+        if self._image is None and self.filepath:
+            from PIL import Image
+            # Only the header is read here, the sheet is not decoded until it is needed
+            with Image.open(self.filepath) as image:
+                return image.size
+        return self.image.size
+
+
+class SheetComponent(SpriteComponent):
+    """ A component whose image is the `sheet_rect` region of a `Spritesheet`.  When
+    `sheet_rotated` is set, the region holds the image rotated 90 degrees counter-clockwise, as
+    in an atlas built with rotation.  The size is known without touching the sheet.
+    """
+
+    def __init__(self, name, sheet, sheet_rect, sheet_rotated=False, extra_meta=None):
+        super(SheetComponent, self).__init__(name, extra_meta=extra_meta)
+        self.sheet = sheet
+        self.sheet_rect = sheet_rect
+        self.sheet_rotated = sheet_rotated
+        if sheet_rotated:
+            self._width, self._height = sheet_rect.height, sheet_rect.width
+        else:
+            self._width, self._height = sheet_rect.size
+
+    @property
+    def image(self):
+        if self._image is None:
+            rect = self.sheet_rect
+            image = self.sheet.image.crop(
+                (rect.x, rect.y, rect.x + rect.width, rect.y + rect.height)
+            )
+            if self.sheet_rotated:
+                from PIL import Image
+                image = image.transpose(Image.ROTATE_270)
+            self._image = image
+        return self._image
+
+
+def slice_grid(sheet, frame_size, columns=None, rows=None, margin=0, spacing=0,
+               name_template=DEFAULT_NAME_TEMPLATE, component_class=SheetComponent):
+    """ Return a dictionary of components by name for the cells of a grid in a sheet, in row
+    order.  Cells are `frame_size` (width, height), start `margin` pixels in from the top left
+    and are `spacing` pixels apart.  By default, the grid has as many columns and rows as fit in
+    the sheet.  Names are made from `name_template`, formatted with the `index`, `row` and
+    `column` of each cell.
+    """
+    frame_width, frame_height = frame_size
+    if columns is None or rows is None:
+        width, height = sheet.size
+        if columns is None:
+            columns = (width - 2 * margin + spacing) // (frame_width + spacing)
+        if rows is None:
+            rows = (height - 2 * margin + spacing) // (frame_height + spacing)
+    components = {}
+    for row in range(rows):
+        for column in range(columns):
+            name = name_template.format(index=row * columns + column, row=row, column=column)
+            if name in components:
+                raise KeyError("Sheet component with name '{0}' already exists".format(name))
+            rect = Rect(
+                margin + column * (frame_width + spacing),
+                margin + row * (frame_height + spacing),
+                frame_width, frame_height,
+            )
+            components[name] = component_class(name, sheet, rect)
+    return components
+
+
+def slice_meta(sheet, meta, component_class=SheetComponent):
+    """ Return a dictionary of components by name for the regions of a sheet given by atlas
+    meta, as returned by `Atlas.get_meta`, such as that of an atlas built earlier.
+    """
+    components = {}
+    for component_meta in meta:
+        rotated = component_meta.get("rotated", False)
+        width, height = component_meta["width"], component_meta["height"]
+        if rotated:
+            width, height = height, width
+        rect = Rect(component_meta["x"], component_meta["y"], width, height)
+        component = component_class(
+            component_meta["name"], sheet, rect, sheet_rotated=rotated,
+            extra_meta=component_meta.get("extra_meta"),
+        )
+        components[component.name] = component
+    return components
+
+
+def read_sheet_meta(sheet, filepath, component_class=SheetComponent):
+    """ Read an atlas meta JSON file and slice the components it describes out of a sheet """
+    import json
+    with open(filepath) as f:
+        return slice_meta(sheet, json.load(f), component_class)
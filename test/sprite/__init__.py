@@ -10,3 +10,12 @@ LEFT2 = os.path.join(IMG_DIR, "left2.png")
 LEFT3 = os.path.join(IMG_DIR, "left3.png")
 LEFT4 = os.path.join(IMG_DIR, "left4.png")
 EXPECTED_FRONT_SIZE = (17, 21)
+
+
+class DummyRenderer(object):
+
+    def __init__(self):
+        self.components = []
+
+    def set_component(self, component_name, **params):
+        self.components.append(component_name)
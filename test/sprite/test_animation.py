@@ -1,9 +1,17 @@
 import unittest2
 from sprite.component import SpriteComponent
-from sprite.animation import SpriteAnimation, SpriteAnimationStage
+from sprite.animation import (
+    SpriteAnimation, SpriteAnimationStage, SpriteAnimationPlayer, TickAnimationPlayer,
+    load_animations, CACHE_SUFFIX,
+)
+import datetime as dt
 import logging
+import os
+import shutil
+import tempfile
+import yaml
 from test.sprite import (
-    FRONT1, FRONT2, FRONT3, EXPECTED_FRONT_SIZE
+    FRONT1, FRONT2, FRONT3, EXPECTED_FRONT_SIZE, DummyRenderer
 )
 
 
@@ -110,3 +118,177 @@ class TestSpriteAnimation(unittest2.TestCase):
     def test_offset_complex(self):
         self.assertEqual(-2.5, self.animation2.offset_x)
         self.assertEqual(-3, self.animation2.offset_y)
+
+
+def seconds(value):
+    return dt.timedelta(seconds=value)
+
+
+class TestSpriteAnimationPlayer(unittest2.TestCase):
+
+    def setUp(self):
+        self.animation = SpriteAnimation("TestAnimation", [
+            SpriteAnimationStage("front1", 0.2, events=["step"]),
+            SpriteAnimationStage("front2", 0.4, events=[{"name": "attack", "time": 0.1}]),
+            SpriteAnimationStage("front3", 0.4, events=[{"name": "late", "time": 1.0}]),
+        ])
+        self.renderer = DummyRenderer()
+        self.player = SpriteAnimationPlayer(self.renderer, self.animation)
+        self.events = []
+        for event in ["step", "attack", "late"]:
+            self.player.add_event_callback(event, self.record_event(event))
+
+    def record_event(self, event):
+        def callback(extra_time):
+            self.events.append((event, extra_time))
+        return callback
+
+    def test_stage_progression(self):
+        self.player.start_animation()
+        self.player.pass_animation_time(seconds(0.25))
+        self.assertEqual(["front1", "front2"], self.renderer.components)
+        self.assertEqual(1, self.player.stage_index)
+
+    def test_end_callback_extra_time(self):
+        ended = []
+        self.player.add_end_callback(lambda extra_time: ended.append(extra_time))
+        self.player.start_animation()
+        self.player.pass_animation_time(seconds(1.5))
+        self.assertTrue(self.player.iscomplete())
+        self.assertEqual([seconds(0.5)], ended)
+
+    def test_event_at_stage_start(self):
+        self.player.start_animation()
+        self.assertEqual([("step", seconds(0))], self.events)
+
+    def test_event_within_stage(self):
+        self.player.start_animation()
+        self.player.pass_animation_time(seconds(0.25))
+        self.assertEqual(["step"], [e[0] for e in self.events])
+        self.player.pass_animation_time(seconds(0.1))
+        self.assertEqual(("attack", seconds(0.05)), self.events[-1])
+
+    def test_events_crossed_in_one_step(self):
+        self.player.start_animation()
+        self.player.pass_animation_time(seconds(1.1))
+        self.assertEqual(
+            [("step", seconds(0)), ("attack", seconds(0.8)), ("late", seconds(0.1))],
+            self.events
+        )
+
+    def test_events_repeat(self):
+        self.player.start_animation()
+        self.player.start_animation()
+        self.assertEqual(["step", "step"], [e[0] for e in self.events])
+
+
+class TestTickAnimationPlayer(unittest2.TestCase):
+
+    def setUp(self):
+        self.animation = SpriteAnimation("TestAnimation", [
+            SpriteAnimationStage("front1", 0.2),
+            SpriteAnimationStage("front2", 0.4, events=[{"name": "attack", "time": 0.1}]),
+        ])
+        self.player = TickAnimationPlayer(self.animation, tick_rate=60)
+        self.attacks = []
+        self.player.add_event_callback("attack", lambda extra_time: self.attacks.append(extra_time))
+
+    def test_ticks(self):
+        self.player.start_animation()
+        self.assertEqual((0, 12, 0), self.player.get_snapshot())
+        self.player.pass_animation_time(20)
+        self.assertEqual((1, 16, 1), self.player.get_snapshot())
+        self.assertEqual([2], self.attacks)
+
+    def test_restore_snapshot(self):
+        self.player.start_animation()
+        self.player.pass_animation_time(13)
+        snapshot = self.player.get_snapshot()
+        other = TickAnimationPlayer(self.animation, tick_rate=60)
+        other.restore_snapshot(snapshot)
+        self.assertEqual("front2", other.stage.component_name)
+        self.player.pass_animation_time(30)
+        other.pass_animation_time(30)
+        self.assertEqual(self.player.get_snapshot(), other.get_snapshot())
+        self.assertTrue(other.iscomplete())
+
+    def test_restore_does_not_refire_events(self):
+        self.player.start_animation()
+        self.player.pass_animation_time(20)
+        self.player.restore_snapshot(self.player.get_snapshot())
+        self.player.pass_animation_time(1)
+        self.assertEqual(1, len(self.attacks))
+
+
+ANIMATION_YAML = """
+animations:
+    - name: walk
+      stages:
+          - component_name: front1
+            duration: 0.2
+          - component_name: front2
+            duration: 0.4
+            displacement_y: -1
+"""
+
+
+class TestLoadAnimations(unittest2.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "animations.yaml")
+        with open(self.path, "w") as f:
+            f.write(ANIMATION_YAML)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_load(self):
+        animations = load_animations(self.path)
+        self.assertEqual(["walk"], list(animations))
+        stages = animations["walk"].stages
+        self.assertEqual(2, len(stages))
+        self.assertEqual("front2", stages[1].component_name)
+        self.assertEqual(0.4, stages[1].duration)
+        self.assertEqual(-1, stages[1].displacement_y)
+        self.assertEqual(0, stages[1].displacement_x)
+
+    def test_cache_written(self):
+        load_animations(self.path)
+        self.assertTrue(os.path.exists(self.path + CACHE_SUFFIX))
+
+    def test_cache_not_written(self):
+        load_animations(self.path, cache=False)
+        self.assertFalse(os.path.exists(self.path + CACHE_SUFFIX))
+
+    def test_cache_invalidated(self):
+        load_animations(self.path)
+        with open(self.path, "w") as f:
+            f.write(ANIMATION_YAML.replace("walk", "run"))
+        stat = os.stat(self.path)
+        os.utime(self.path, (stat.st_atime, stat.st_mtime + 10))
+        self.assertEqual(["run"], list(load_animations(self.path)))
+
+    def test_cache_invalidated_same_size(self):
+        load_animations(self.path)
+        stat = os.stat(self.path)
+        with open(self.path, "w") as f:
+            f.write(ANIMATION_YAML.replace("duration: 0.2", "duration: 0.9"))
+        os.utime(self.path, (stat.st_atime, stat.st_mtime))
+        animation = load_animations(self.path)["walk"]
+        self.assertEqual(0.9, animation.stages[0].duration)
+
+    def test_dump_round_trip(self):
+        stages = [
+            SpriteAnimationStage("front1", 0.2),
+            SpriteAnimationStage("front2", 0.4, events=({"name": "step", "time": 0.1},)),
+        ]
+        self.assertNotIn("events", stages[0].get_params())
+        data = {"animations": [
+            {"name": "walk", "stages": [stage.__getstate__() for stage in stages]}
+        ]}
+        with open(self.path, "w") as f:
+            yaml.dump(data, f)
+        loaded = load_animations(self.path, cache=False)["walk"].stages
+        self.assertEqual([], loaded[0].get_events())
+        self.assertEqual([(0.1, "step")], loaded[1].get_events())
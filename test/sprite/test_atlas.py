@@ -0,0 +1,264 @@
+import unittest2
+from PIL import Image
+from sprite.component import SpriteComponent, Rect, load_components, get_group_rects
+from sprite.atlas import (
+    Atlas, ORDERS, SPLIT_RULES, ORDER_INSERTION, SPLIT_MAX_LEFTOVER, get_animation_groups,
+    _pack_sizes,
+)
+from sprite.animation import SpriteAnimation, SpriteAnimationStage
+import io
+import logging
+
+
+LOG = logging.getLogger(__name__)
+
+
+def solid_component(name, size, color=(255, 0, 0, 255)):
+    return SpriteComponent(name, image=Image.new("RGBA", size, color))
+
+
+class TestAtlasRotation(unittest2.TestCase):
+
+    def setUp(self):
+        self.wide = solid_component("wide", (16, 4))
+        self.tall = solid_component("tall", (4, 16), (0, 0, 255, 255))
+
+    def make_atlas(self, allow_rotation):
+        atlas = Atlas(min_size=(16, 8), allow_rotation=allow_rotation)
+        atlas.add_component(self.wide)
+        atlas.add_component(self.tall)
+        return atlas
+
+    def test_without_rotation_doubles(self):
+        atlas = self.make_atlas(allow_rotation=False)
+        self.assertEqual((32, 16), atlas.size)
+        self.assertFalse(self.tall.rotated)
+
+    def test_rotation_keeps_size(self):
+        atlas = self.make_atlas(allow_rotation=True)
+        self.assertEqual((16, 8), atlas.size)
+        self.assertTrue(self.tall.rotated)
+        self.assertEqual((4, 16), self.tall.size)
+        self.assertEqual(Rect(0, 4, 16, 4), self.tall.rect)
+
+    def test_rotated_meta(self):
+        atlas = self.make_atlas(allow_rotation=True)
+        meta = dict((m["name"], m) for m in atlas.get_meta())
+        self.assertTrue(meta["tall"]["rotated"])
+        self.assertNotIn("rotated", meta["wide"])
+        component = SpriteComponent.from_meta(meta["tall"])
+        self.assertTrue(component.rotated)
+        self.assertEqual(self.tall.rect, component.rect)
+
+    def test_rotated_dump(self):
+        atlas = self.make_atlas(allow_rotation=True)
+        output = io.BytesIO()
+        atlas.dump_atlas(output)
+        output.seek(0)
+        sheet = Image.open(output)
+        self.assertEqual((0, 0, 255, 255), sheet.getpixel((15, 7)))
+        self.assertEqual((255, 0, 0, 255), sheet.getpixel((15, 3)))
+
+
+class TestAtlasMipmaps(unittest2.TestCase):
+
+    def setUp(self):
+        self.atlas = Atlas(min_size=(14, 14), mip_levels=3)
+        self.red = solid_component("red", (6, 5))
+        self.blue = solid_component("blue", (9, 3), (0, 0, 255, 255))
+        self.atlas.add_component(self.red)
+        self.atlas.add_component(self.blue)
+
+    def test_alignment(self):
+        self.assertEqual(4, self.atlas.alignment)
+        self.assertEqual((16, 16), self.atlas.size)
+        self.assertEqual(Rect(0, 8, 9, 3), self.blue.rect)
+
+    def test_levels(self):
+        images = self.atlas.render_mipmaps()
+        self.assertEqual([(16, 16), (8, 8), (4, 4)], [image.size for image in images])
+
+    def test_mip_rect(self):
+        images = self.atlas.render_mipmaps()
+        self.assertEqual(Rect(0, 0, 2, 2), self.red.get_mip_rect(2))
+        for level, image in enumerate(images):
+            rect = self.blue.get_mip_rect(level)
+            color = image.getpixel((rect.x, rect.y))
+            self.assertEqual(0, color[0])
+            self.assertEqual(0, color[1])
+
+
+class TestAtlasVariants(unittest2.TestCase):
+
+    def setUp(self):
+        self.atlas = Atlas(min_size=(16, 8), allow_rotation=True)
+        self.atlas.add_component(solid_component("wide", (16, 4)))
+        self.atlas.add_component(solid_component("tall", (3, 16), (0, 0, 255, 255)))
+
+    def test_scaled_meta(self):
+        meta = dict((m["name"], m) for m in self.atlas.get_meta(scale=2))
+        self.assertEqual((0, 8), (meta["tall"]["x"], meta["tall"]["y"]))
+        self.assertEqual((6, 32), (meta["tall"]["width"], meta["tall"]["height"]))
+        self.assertEqual(Rect(0, 8, 32, 6), SpriteComponent.from_meta(meta["tall"]).rect)
+
+    def test_fractional_meta(self):
+        meta = dict((m["name"], m) for m in self.atlas.get_meta(scale=0.5))
+        self.assertEqual((8, 2), (meta["wide"]["width"], meta["wide"]["height"]))
+        self.assertEqual(2, meta["tall"]["y"])
+
+    def test_collapsed_scale(self):
+        atlas = Atlas(min_size=(2, 1))
+        atlas.add_component(solid_component("left", (1, 1)))
+        atlas.add_component(solid_component("right", (1, 1)))
+        self.assertRaises(ValueError, atlas.get_meta, scale=0.5)
+        self.assertRaises(ValueError, atlas.render_atlas, scale=0.5)
+
+    def test_render_scaled(self):
+        image = self.atlas.render_atlas(scale=3, workers=2)
+        self.assertEqual((48, 24), image.size)
+        self.assertEqual((255, 0, 0, 255), image.getpixel((47, 11)))
+        self.assertEqual((0, 0, 255, 255), image.getpixel((47, 20)))
+        self.assertEqual(0, image.getpixel((47, 21))[3])
+
+
+class TestAtlasOptimize(unittest2.TestCase):
+
+    def setUp(self):
+        self.atlas = Atlas(min_size=(8, 8))
+        sizes = [("wide", (6, 4)), ("tall", (2, 6)), ("small1", (2, 2)), ("small2", (2, 2))]
+        for name, size in sizes:
+            self.atlas.add_component(solid_component(name, size))
+
+    def test_insertion_order_grows(self):
+        self.assertEqual((16, 16), self.atlas.size)
+
+    def test_optimize_in_process(self):
+        candidate = self.atlas.optimize(workers=0)
+        self.assertNotEqual((ORDER_INSERTION, SPLIT_MAX_LEFTOVER), candidate)
+        self.assertEqual((8, 8), self.atlas.size)
+        self.assertEqual(candidate[1], self.atlas.split)
+        self.assertEqual(4, len(self.atlas.components))
+
+    def test_optimize_workers(self):
+        self.atlas.optimize(workers=2)
+        self.assertEqual((8, 8), self.atlas.size)
+        image = self.atlas.render_atlas()
+        for component in self.atlas.components.values():
+            self.assertEqual((255, 0, 0, 255), image.getpixel(component.rect.position))
+
+    def test_optimize_candidates(self):
+        candidate = (ORDER_INSERTION, SPLIT_MAX_LEFTOVER)
+        self.assertEqual(candidate, self.atlas.optimize(candidates=[candidate], workers=0))
+        self.assertEqual((16, 16), self.atlas.size)
+
+    def test_optimize_timeout(self):
+        import multiprocessing
+        self.atlas.optimize(workers=2, timeout=0)
+        self.assertEqual([], multiprocessing.active_children())
+
+    def test_optimize_header(self):
+        atlas = Atlas(header="sprite atlas\n{size}", min_size=(8, 8))
+        atlas.add_component(solid_component("wide", (6, 4)))
+        atlas.add_component(solid_component("tall", (2, 6)))
+        assertPredictedSizes(self, atlas)
+        self.assertIn("ATLAS_HEADER", atlas.components)
+
+
+def assertPredictedSizes(testcase, atlas):
+    """ Check that each candidate re-packs to the area `optimize` scores it at """
+    for order in ORDERS:
+        for split in SPLIT_RULES:
+            sizes, _ = atlas._get_packing_sizes()
+            area, _, _ = _pack_sizes(
+                sizes, order, split, atlas.min_size, atlas.allow_rotation, atlas.alignment,
+                atlas._header
+            )
+            atlas.optimize(candidates=[(order, split)], workers=0)
+            testcase.assertEqual(area, atlas.size[0] * atlas.size[1], (order, split))
+
+
+class TestAtlasGroups(unittest2.TestCase):
+
+    def setUp(self):
+        self.walk = [solid_component("walk{0}".format(i), (4, 4)) for i in range(4)]
+        self.other = [solid_component("other{0}".format(i), (6, 2)) for i in range(3)]
+
+    def assertInGroup(self, atlas, name, components):
+        rect = atlas.get_group_rects()[name]
+        for component in components:
+            self.assertTrue(rect.x <= component.rect.x)
+            self.assertTrue(rect.y <= component.rect.y)
+            self.assertTrue(component.rect.x + component.rect.width <= rect.x + rect.width)
+            self.assertTrue(component.rect.y + component.rect.height <= rect.y + rect.height)
+
+    def test_group_region(self):
+        atlas = Atlas(min_size=(8, 8))
+        atlas.add_component(self.other[0])
+        atlas.add_group("walk", self.walk)
+        self.assertEqual(Rect(0, 2, 8, 8), atlas.get_group_rects()["walk"])
+        self.assertInGroup(atlas, "walk", self.walk)
+        self.assertEqual(5, len(atlas.components))
+
+    def test_group_kept_on_reset(self):
+        atlas = Atlas(min_size=(8, 8))
+        atlas.add_group("walk", self.walk)
+        for component in self.other:
+            atlas.add_component(component)
+        self.assertEqual((16, 16), atlas.size)
+        self.assertInGroup(atlas, "walk", self.walk)
+
+    def test_group_optimize(self):
+        atlas = Atlas(min_size=(8, 8))
+        for component in self.other:
+            atlas.add_component(component)
+        atlas.add_group("walk", self.walk)
+        atlas.optimize(workers=0)
+        self.assertEqual(7, len(atlas.components))
+        self.assertInGroup(atlas, "walk", self.walk)
+
+    def test_groups_optimize_predicted(self):
+        atlas = Atlas(min_size=(8, 8))
+        atlas.add_group("walk", self.walk)
+        for name in ["run", "jump", "fall"]:
+            atlas.add_group(name, [
+                solid_component("{0}{1}".format(name, i), (4, 4)) for i in range(4)
+            ])
+        atlas.add_group("blink", [solid_component("blink", (4, 4))])
+        self.assertEqual((32, 32), atlas.size)
+        assertPredictedSizes(self, atlas)
+        self.assertEqual(["blink", "fall", "jump", "run", "walk"], sorted(atlas.groups))
+        self.assertInGroup(atlas, "walk", self.walk)
+
+    def test_group_meta(self):
+        atlas = Atlas(min_size=(8, 8))
+        atlas.add_component(self.other[0])
+        atlas.add_group("walk", self.walk)
+        meta = atlas.get_meta()
+        components = load_components(meta)
+        self.assertIsNone(components["other0"].group)
+        self.assertEqual(atlas.get_group_rects(), get_group_rects(components))
+        self.assertEqual(meta, [c.get_meta() for c in components.values()])
+        scaled = dict((m["name"], m) for m in atlas.get_meta(scale=2))
+        self.assertEqual(
+            {"name": "walk", "x": 0, "y": 4, "width": 16, "height": 16}, scaled["walk0"]["group"]
+        )
+
+    def test_duplicate_group(self):
+        atlas = Atlas(min_size=(8, 8))
+        atlas.add_group("walk", self.walk[:2])
+        self.assertRaises(KeyError, atlas.add_group, "walk", self.walk[2:])
+        self.assertRaises(KeyError, atlas.add_group, "run", self.walk[:1])
+
+    def test_animation_groups(self):
+        components = dict((c.name, c) for c in self.walk + self.other)
+        walk = SpriteAnimation("walk", [
+            SpriteAnimationStage(component, 0.1) for component in self.walk + self.walk[:1]
+        ])
+        idle = SpriteAnimation("idle", [
+            SpriteAnimationStage(self.walk[0], 0.1), SpriteAnimationStage(self.other[0], 0.1),
+            SpriteAnimationStage("missing", 0.1),
+        ])
+        groups = get_animation_groups([walk, idle], components)
+        self.assertEqual(["walk", "idle"], [name for name, _ in groups])
+        self.assertEqual(self.walk, groups[0][1])
+        self.assertEqual([self.other[0]], groups[1][1])
@@ -0,0 +1,156 @@
+import unittest2
+from PIL import Image
+from sprite.component import SpriteComponent, Rect
+from sprite.cache import FrameCache, PillowBackend, NumpyBackend
+import logging
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+LOG = logging.getLogger(__name__)
+
+
+def make_source():
+    source = Image.new("RGBA", (8, 8), (0, 0, 0, 0))
+    source.paste(Image.new("RGBA", (2, 4), (255, 0, 0, 255)), (0, 0))
+    source.paste(Image.new("RGBA", (1, 4), (0, 255, 0, 255)), (1, 0))
+    source.paste(Image.new("RGBA", (4, 2), (0, 0, 255, 255)), (4, 0))
+    return source
+
+
+def make_components():
+    rotated = SpriteComponent.from_meta(
+        {"name": "rotated", "x": 4, "y": 0, "width": 2, "height": 4, "rotated": True}
+    )
+    return {
+        "plain": SpriteComponent("plain", rect=Rect(0, 0, 2, 4)),
+        "rotated": rotated,
+    }
+
+
+class TestFrameCache(unittest2.TestCase):
+
+    def setUp(self):
+        self.cache = FrameCache(make_source(), make_components(), max_bytes=180)
+
+    def test_shared(self):
+        frame = self.cache.get("plain")
+        self.assertIs(frame, self.cache.get("plain"))
+        self.assertEqual((2, 4), frame.size)
+        stats = self.cache.get_stats()
+        self.assertEqual((1, 1), (stats["hits"], stats["misses"]))
+        self.assertEqual(32, stats["size_bytes"])
+
+    def test_scale_and_flip(self):
+        frame = self.cache.get("plain", scale=2, flip_x=True)
+        self.assertEqual((4, 8), frame.size)
+        self.assertEqual((0, 255, 0, 255), frame.getpixel((0, 0)))
+        self.assertEqual((255, 0, 0, 255), frame.getpixel((3, 0)))
+
+    def test_rotated(self):
+        frame = self.cache.get("rotated")
+        self.assertEqual((2, 4), frame.size)
+        self.assertEqual((0, 0, 255, 255), frame.getpixel((1, 3)))
+
+    def test_eviction(self):
+        self.cache.get("plain")
+        self.cache.get("rotated")
+        self.cache.get("plain")
+        self.cache.get("rotated", scale=2)
+        stats = self.cache.get_stats()
+        self.assertEqual(1, stats["evictions"])
+        self.assertEqual(2, stats["frames"])
+        self.assertEqual(160, stats["size_bytes"])
+        self.cache.get("plain")
+        self.assertEqual(2, self.cache.get_stats()["hits"])
+
+    def test_too_large(self):
+        self.cache.get("plain", scale=3)
+        self.assertEqual(0, self.cache.get_stats()["frames"])
+
+    def test_invalidate(self):
+        self.cache.get("plain")
+        self.cache.get("rotated")
+        self.cache.invalidate("plain")
+        self.assertEqual(1, self.cache.get_stats()["frames"])
+        self.assertEqual(32, self.cache.size_bytes)
+
+
+class TestFrameCacheReload(unittest2.TestCase):
+
+    def setUp(self):
+        self.components = make_components()
+        self.plain = self.components["plain"]
+        self.source = make_source()
+        self.cache = FrameCache(self.source, self.components)
+        self.meta = [c.get_meta() for c in self.components.values()]
+
+    def test_unchanged(self):
+        self.cache.get("plain")
+        diff = self.cache.reload(self.meta, make_source())
+        self.assertEqual([], diff["added"] + diff["removed"] + diff["moved"] + diff["changed"])
+        self.assertFalse(diff["replaced"])
+        self.assertEqual(1, self.cache.get_stats()["frames"])
+
+    def test_changed_pixels(self):
+        frame = self.cache.get("plain")
+        image = make_source()
+        image.paste(Image.new("RGBA", (2, 4), (255, 255, 0, 255)), (0, 0))
+        image.paste(Image.new("RGBA", (1, 1), (9, 9, 9, 255)), (7, 7))
+        diff = self.cache.reload(self.meta, image)
+        self.assertEqual(["plain"], diff["changed"])
+        self.assertIs(self.plain, self.components["plain"])
+        self.assertIsNot(frame, self.cache.get("plain"))
+        self.assertEqual((255, 255, 0, 255), self.source.getpixel((0, 0)))
+        self.assertEqual((0, 0, 0, 0), self.source.getpixel((7, 7)))
+
+    def test_moved_added_removed(self):
+        image = Image.new("RGBA", (8, 8), (0, 0, 0, 0))
+        image.paste(make_source().crop((0, 0, 2, 4)), (4, 4))
+        image.paste(Image.new("RGBA", (1, 1), (9, 9, 9, 255)), (0, 0))
+        meta = [
+            {"name": "plain", "x": 4, "y": 4, "width": 2, "height": 4},
+            {"name": "dot", "x": 0, "y": 0, "width": 1, "height": 1, "extra_meta": {"a": 1}},
+        ]
+        diff = self.cache.reload(meta, image)
+        self.assertEqual(["dot"], diff["added"])
+        self.assertEqual(["rotated"], diff["removed"])
+        self.assertEqual(["plain"], diff["moved"])
+        self.assertIs(self.plain, self.components["plain"])
+        self.assertEqual(Rect(4, 4, 2, 4), self.plain.rect)
+        self.assertEqual((255, 0, 0, 255), self.cache.get("plain").getpixel((0, 0)))
+        self.assertEqual((9, 9, 9, 255), self.cache.get("dot").getpixel((0, 0)))
+        self.assertIs(self.source, self.cache.source)
+
+    def test_resized(self):
+        image = Image.new("RGBA", (16, 8), (0, 0, 0, 0))
+        image.paste(make_source(), (0, 0))
+        diff = self.cache.reload(self.meta, image)
+        self.assertTrue(diff["replaced"])
+        self.assertIs(image, self.cache.source)
+
+
+@unittest2.skipIf(numpy is None, "numpy is not installed")
+class TestNumpyFrameCache(unittest2.TestCase):
+
+    def test_reload(self):
+        source = numpy.array(make_source())
+        cache = FrameCache(source, make_components(), NumpyBackend())
+        meta = [c.get_meta() for c in cache.components.values()]
+        image = source.copy()
+        image[0, 0] = (1, 2, 3, 4)
+        diff = cache.reload(meta, image)
+        self.assertEqual(["plain"], diff["changed"])
+        self.assertEqual([1, 2, 3, 4], list(source[0, 0]))
+
+    def test_matches_pillow(self):
+        pillow = FrameCache(make_source(), make_components(), PillowBackend())
+        arrays = FrameCache(numpy.asarray(make_source()), make_components(), NumpyBackend())
+        for name in ["plain", "rotated"]:
+            expected = numpy.asarray(pillow.get(name, scale=3, flip_x=True, flip_y=True))
+            self.assertTrue(
+                numpy.array_equal(expected, arrays.get(name, scale=3, flip_x=True, flip_y=True))
+            )
@@ -1,5 +1,5 @@
 import unittest2
-from sprite.component import SpriteComponent, Rect
+from sprite.component import SpriteComponent, Rect, load_components
 import logging
 import os
 
@@ -69,3 +69,8 @@ class TestSpriteComponent(unittest2.TestCase):
 
     def test_rect_is_private(self):
         self.assertRaises(AttributeError, setattr, self.img1, "rect", Rect(1, 2, 3, 4))
+
+    def test_load_components(self):
+        components = load_components([self.img2.get_meta()])
+        self.assertEqual(["img2"], list(components))
+        self.assertEqual(self.img2.rect, components["img2"].rect)
@@ -0,0 +1,95 @@
+import unittest2
+from PIL import Image
+from sprite.atlas import Atlas, BC1, BC3, BLOCK_SIZE
+from sprite.component import SpriteComponent
+import io
+import logging
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+LOG = logging.getLogger(__name__)
+
+
+def decode_dds(data):
+    image = Image.open(io.BytesIO(data))
+    image.load()
+    return image.convert("RGBA")
+
+
+@unittest2.skipIf(numpy is None, "numpy is required for block compression")
+class TestBlockCompression(unittest2.TestCase):
+
+    def setUp(self):
+        self.atlas = Atlas(min_size=(10, 10), alignment=BLOCK_SIZE)
+        self.atlas.add_component(
+            SpriteComponent("red", image=Image.new("RGBA", (3, 5), (255, 0, 0, 255)))
+        )
+        self.atlas.add_component(
+            SpriteComponent("green", image=Image.new("RGBA", (6, 2), (0, 255, 0, 128)))
+        )
+
+    def dump(self, codec):
+        output = io.BytesIO()
+        self.atlas.dump_compressed_atlas(output, codec)
+        return output.getvalue()
+
+    def test_aligned(self):
+        self.assertEqual((12, 12), self.atlas.size)
+        for component in self.atlas.components.values():
+            self.assertEqual(0, component.rect.x % BLOCK_SIZE)
+            self.assertEqual(0, component.rect.y % BLOCK_SIZE)
+
+    def test_meta_unchanged(self):
+        meta = dict((m["name"], m) for m in self.atlas.get_meta())
+        self.assertEqual((3, 5), SpriteComponent.from_meta(meta["red"]).size)
+
+    def test_bc1(self):
+        data = self.dump(BC1)
+        self.assertEqual(128 + 9 * 8, len(data))
+        image = decode_dds(data)
+        red = self.atlas.components["red"].rect
+        self.assertEqual((255, 0, 0, 255), image.getpixel((red.x, red.y)))
+        self.assertEqual(0, image.getpixel((red.x + 3, red.y))[3])
+
+    def test_bc3(self):
+        data = self.dump(BC3)
+        self.assertEqual(128 + 9 * 16, len(data))
+        image = decode_dds(data)
+        green = self.atlas.components["green"].rect
+        self.assertEqual((0, 255, 0, 128), image.getpixel((green.x + 5, green.y + 1)))
+        self.assertEqual(0, image.getpixel((green.x, green.y + 2))[3])
+
+    def test_mipmap_blocks(self):
+        atlas = Atlas(min_size=(10, 10), alignment=BLOCK_SIZE, mip_levels=3)
+        atlas.add_component(
+            SpriteComponent("red", image=Image.new("RGBA", (3, 5), (255, 0, 0, 255)))
+        )
+        atlas.add_component(
+            SpriteComponent("green", image=Image.new("RGBA", (6, 2), (0, 255, 0, 128)))
+        )
+        self.assertEqual(16, atlas.alignment)
+        for level, image in enumerate(atlas.render_mipmaps()):
+            self.assertEqual(0, image.size[0] % BLOCK_SIZE)
+            self.assertEqual(0, image.size[1] % BLOCK_SIZE)
+            blocks = set()
+            for component in atlas.components.values():
+                rect = component.get_mip_rect(level)
+                component_blocks = set(
+                    (x // BLOCK_SIZE, y // BLOCK_SIZE)
+                    for x in range(rect.x, rect.x + rect.width)
+                    for y in range(rect.y, rect.y + rect.height)
+                )
+                self.assertFalse(blocks & component_blocks)
+                blocks |= component_blocks
+
+    def test_unaligned(self):
+        atlas = Atlas(min_size=(10, 10))
+        atlas.add_component(
+            SpriteComponent("red", image=Image.new("RGBA", (3, 5), (255, 0, 0, 255)))
+        )
+        with self.assertRaises(ValueError):
+            atlas.dump_compressed_atlas(io.BytesIO())
@@ -0,0 +1,73 @@
+import unittest2
+from sprite.component import SpriteComponent, Rect
+from sprite.animation import SpriteAnimation, SpriteAnimationPlayer
+from sprite.culling import CullingGrid
+from sprite.drawlist import AtlasRenderer
+from test.sprite import DummyRenderer
+import datetime as dt
+import logging
+
+
+LOG = logging.getLogger(__name__)
+
+
+class TestCullingGrid(unittest2.TestCase):
+
+    def setUp(self):
+        self.components = components = {
+            "a": SpriteComponent("a", rect=Rect(0, 0, 10, 10)),
+            "b": SpriteComponent("b", rect=Rect(0, 0, 20, 10)),
+        }
+        self.animation = SpriteAnimation.load({
+            "name": "test",
+            "stages": [
+                {"component_name": "a", "duration": 0.1},
+                {"component_name": "b", "duration": 0.1, "displacement_x": 10},
+            ],
+        })
+        self.animation.set_components(components)
+        self.grid = CullingGrid(cell_size=50)
+        self.players = []
+        for position in [(0, 0), (100, 0), (1000, 1000)]:
+            player = SpriteAnimationPlayer(DummyRenderer(), self.animation)
+            player.start_animation()
+            self.grid.insert(player, *position)
+            self.players.append(player)
+
+    def test_bounds(self):
+        self.assertEqual((95, -5, 120, 5), self.grid.get_bounds(self.players[1], 100, 0))
+
+    def test_scaled_flipped_bounds(self):
+        renderer = AtlasRenderer(self.components, scale=3, flip_x=True)
+        player = SpriteAnimationPlayer(renderer, self.animation)
+        player.start_animation()
+        player.pass_animation_time(dt.timedelta(seconds=0.15))
+        self.grid.insert(player, 0, 0)
+        self.assertEqual((-60, -15, 15, 15), self.grid.get_bounds(player, 0, 0))
+        rect = renderer.get_dst_rect()
+        self.assertEqual((-60, -15), (rect.x, rect.y))
+        self.assertEqual(set([player]), self.grid.query((-65, -40, 10, 40)))
+
+    def test_query(self):
+        self.assertEqual(set(self.players[:2]), self.grid.query((-10, -10, 200, 20)))
+        self.assertEqual(set([self.players[1]]), self.grid.query((110, -100, 5, 200)))
+        self.assertEqual(set(), self.grid.query((500, 500, 100, 100)))
+
+    def test_move(self):
+        self.grid.move(self.players[2], 0, 0)
+        self.assertEqual(set([self.players[0], self.players[2]]), self.grid.query((0, 0, 1, 1)))
+        self.assertEqual(set(), self.grid.query((990, 990, 20, 20)))
+
+    def test_remove(self):
+        self.grid.remove(self.players[0])
+        self.assertEqual(set(), self.grid.query((0, 0, 1, 1)))
+
+    def test_cull(self):
+        self.grid.cull((-10, -10, 200, 20))
+        self.assertEqual([True, True, False], [p.visible for p in self.players])
+        hidden = self.players[2]
+        hidden.pass_animation_time(dt.timedelta(seconds=0.15))
+        self.assertEqual(["a"], hidden.renderer.components)
+        self.grid.cull((900, 900, 200, 200))
+        self.assertEqual([False, False, True], [p.visible for p in self.players])
+        self.assertEqual(["a", "b"], hidden.renderer.components)
@@ -0,0 +1,69 @@
+import unittest2
+from PIL import Image
+from sprite.component import SpriteComponent, Rect
+from sprite.animation import SpriteAnimation, SpriteAnimationStage, SpriteAnimationPlayer
+from sprite.cache import FrameCache
+from sprite.drawlist import AtlasRenderer, DrawList, FLIP_X
+import datetime as dt
+import logging
+
+
+LOG = logging.getLogger(__name__)
+
+
+class TestDrawList(unittest2.TestCase):
+
+    def setUp(self):
+        self.components = {
+            "a": SpriteComponent("a", rect=Rect(0, 0, 4, 6)),
+            "b": SpriteComponent("b", rect=Rect(4, 0, 2, 2)),
+        }
+        self.animation = SpriteAnimation("test", [
+            SpriteAnimationStage("a", 0.1, displacement_x=1),
+            SpriteAnimationStage("b", 0.1),
+        ])
+        self.renderers = [
+            AtlasRenderer(self.components, page=1, position=(10, 10), z=0),
+            AtlasRenderer(self.components, page=0, position=(20, 10), z=1, flip_x=True),
+            AtlasRenderer(self.components, page=0, position=(30, 10), z=0, scale=2),
+            AtlasRenderer(self.components, page=0),
+        ]
+        for renderer in self.renderers[:3]:
+            SpriteAnimationPlayer(renderer, self.animation).start_animation()
+        self.renderers[2].set_component("b")
+
+    def test_order(self):
+        draw_list = DrawList.build(self.renderers)
+        self.assertEqual(3, len(draw_list))
+        self.assertEqual([0, 1, 0], list(draw_list.pages))
+        self.assertEqual(["b", "a", "a"], draw_list.names)
+        self.assertEqual(2, draw_list.get_page_switches())
+
+    def test_rects(self):
+        draw_list = DrawList.build(self.renderers)
+        self.assertEqual([4, 0, 2, 2, 0, 0, 4, 6, 0, 0, 4, 6], list(draw_list.src_rects))
+        self.assertEqual(
+            [28, 8, 4, 4, 9, 7, 4, 6, 17, 7, 4, 6], list(draw_list.dst_rects)
+        )
+        self.assertEqual([0, 0, FLIP_X], list(draw_list.flags))
+
+    def test_invisible(self):
+        self.renderers[0].visible = False
+        self.assertEqual(2, len(DrawList.build(self.renderers)))
+
+    def test_blits(self):
+        draw_list = DrawList.build(self.renderers)
+        pages = [Image.new("RGBA", (8, 8)), Image.new("RGBA", (8, 8))]
+        caches = [FrameCache(page, self.components) for page in pages]
+        blits = draw_list.get_blits(pages, caches)
+        self.assertEqual((4, 4), blits[0][0].size)
+        self.assertEqual((pages[1], (9, 7), (0, 0, 4, 6)), blits[1])
+        self.assertEqual((17, 7), blits[2][1])
+        self.assertIs(caches[0].get("a", flip_x=True), blits[2][0])
+
+    def test_follows_animation(self):
+        player = SpriteAnimationPlayer(self.renderers[3], self.animation)
+        player.start_animation()
+        player.pass_animation_time(dt.timedelta(seconds=0.15))
+        draw_list = DrawList.build(self.renderers[3:])
+        self.assertEqual(["b"], draw_list.names)
@@ -0,0 +1,60 @@
+import unittest2
+import logging
+import os
+import subprocess
+import sys
+
+
+LOG = logging.getLogger(__name__)
+
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+RUNTIME_MODULES = [
+    "sprite.component",
+    "sprite.animation",
+    "sprite.atlas",
+    "sprite.schedule",
+    "sprite.cache",
+    "sprite.drawlist",
+    "sprite.culling",
+    "sprite.lod",
+    "sprite.residency",
+    "sprite.sheet",
+    "sprite.library",
+]
+BUILD_DEPENDENCIES = ["PIL", "yaml", "numpy"]
+IMPORT_SCRIPT = """
+import sys, time
+start = time.perf_counter()
+for name in sys.argv[1:]:
+    __import__(name)
+print(time.perf_counter() - start)
+print(",".join(sorted(set(m.split(".")[0] for m in sys.modules))))
+"""
+
+
+def time_import(modules, repeat=3):
+    """ Import modules in fresh interpreters, and return the fastest import time in seconds and
+    the top level modules that were loaded.
+    """
+    results = []
+    for _ in range(repeat):
+        output = subprocess.check_output(
+            [sys.executable, "-c", IMPORT_SCRIPT] + modules, cwd=ROOT_DIR
+        ).decode().splitlines()
+        results.append((float(output[0]), output[1].split(",")))
+    return min(results)
+
+
+class TestRuntimeImports(unittest2.TestCase):
+
+    def test_no_build_dependencies(self):
+        _, loaded = time_import(RUNTIME_MODULES)
+        for name in BUILD_DEPENDENCIES:
+            self.assertNotIn(name, loaded)
+
+    def test_startup_time(self):
+        runtime, _ = time_import(RUNTIME_MODULES)
+        with_pillow, _ = time_import(RUNTIME_MODULES + ["PIL.Image", "PIL.ImageDraw"])
+        LOG.info("Runtime import %.4fs, with Pillow %.4fs", runtime, with_pillow)
+        self.assertLess(runtime, with_pillow)
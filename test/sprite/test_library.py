@@ -0,0 +1,75 @@
+import unittest2
+from sprite.animation import SpriteAnimation, SpriteAnimationStage, TickAnimationPlayer
+from sprite.library import AnimationLibrary, build_animation_library
+import json
+import logging
+import pickle
+
+
+LOG = logging.getLogger(__name__)
+
+
+def make_animations():
+    animations = []
+    for direction in ["north", "south"]:
+        animations.append(SpriteAnimation("walk_" + direction, [
+            SpriteAnimationStage("walk_" + direction + "_1", 0.25, displacement_x=1),
+            SpriteAnimationStage(
+                "walk_" + direction + "_2", 0.25, events=[{"name": "step", "time": 0.1}]
+            ),
+        ]))
+    animations.append(SpriteAnimation("walk_default", [
+        SpriteAnimationStage("walk_north_1", 0.25, displacement_x=1),
+        SpriteAnimationStage("walk_north_2", 0.25, events=[{"name": "step", "time": 0.1}]),
+    ]))
+    animations.append(SpriteAnimation("idle", [SpriteAnimationStage("walk_north_1", 1)]))
+    return animations
+
+
+class TestAnimationLibrary(unittest2.TestCase):
+
+    def setUp(self):
+        self.library = AnimationLibrary.from_animations(make_animations())
+
+    def test_shared(self):
+        self.assertEqual(
+            {"animations": 4, "sequences": 3, "stages": 5, "stage_references": 7},
+            self.library.get_stats()
+        )
+        north = self.library.get_animation("walk_north")
+        default = self.library.get_animation("walk_default")
+        self.assertIs(north.stages[0], default.stages[0])
+        self.assertEqual([(0.1, "step")], north.stages[1].get_events())
+        self.assertEqual(1, north.stages[0].displacement_x)
+
+    def test_pickle(self):
+        library = pickle.loads(pickle.dumps(self.library))
+        self.assertEqual(self.library.get_stats(), library.get_stats())
+        stage = library.get_animation("walk_south").stages[1]
+        self.assertEqual("walk_south_2", stage.component_name)
+
+    def test_json(self):
+        library = AnimationLibrary.load(json.loads(json.dumps(self.library.get_data())))
+        self.assertEqual(self.library.get_data(), library.get_data())
+        library.add_animation(SpriteAnimation("walk_copy", make_animations()[0].stages))
+        self.assertEqual(5, library.get_stats()["stages"])
+        self.assertEqual(3, library.get_stats()["sequences"])
+
+    def test_playback(self):
+        player = TickAnimationPlayer(self.library.get_animation("walk_south"), 100)
+        events = []
+        player.add_event_callback("step", lambda extra_time: events.append(extra_time))
+        player.start_animation()
+        player.pass_animation_time(40)
+        self.assertEqual(1, player.stage_index)
+        self.assertEqual([5], events)
+
+    def test_from_data(self):
+        data = {"animations": [
+            {"name": "a", "stages": [{"component_name": "x", "duration": 0.5}]},
+            {"name": "b", "stages": [{"component_name": "x", "duration": 0.5,
+                                      "displacement_x": 0}]},
+        ]}
+        library = build_animation_library(data)
+        self.assertEqual(1, library.get_stats()["sequences"])
+        self.assertRaises(KeyError, library.add_animation_data, "a", [])
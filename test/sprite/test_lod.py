@@ -0,0 +1,71 @@
+import unittest2
+from sprite.animation import SpriteAnimation, SpriteAnimationStage, TickAnimationPlayer
+from sprite.lod import LODScheduler
+import logging
+
+
+LOG = logging.getLogger(__name__)
+
+
+class TestLODScheduler(unittest2.TestCase):
+
+    def setUp(self):
+        self.animation = SpriteAnimation("test", [
+            SpriteAnimationStage("a", 0.1, events=["step"]),
+            SpriteAnimationStage("b", 0.2),
+        ])
+        self.scheduler = LODScheduler(tier_intervals=(1, 4), zero_time=0)
+        self.events = {}
+
+    def make_player(self, name):
+        player = TickAnimationPlayer(self.animation, tick_rate=60)
+        self.events[name] = []
+        player.add_event_callback("step", lambda extra_time: self.events[name].append(extra_time))
+        player.start_animation()
+        return player
+
+    def test_reduced_rate(self):
+        full = self.make_player("full")
+        reduced = self.make_player("reduced")
+        self.scheduler.add(full, 0)
+        self.scheduler.add(reduced, 1)
+        synced = reduced.get_snapshot()
+        for i in range(1, 13):
+            self.scheduler.tick(1)
+            if i % 4:
+                self.assertEqual(synced, reduced.get_snapshot())
+            else:
+                self.assertEqual(full.get_snapshot(), reduced.get_snapshot())
+                synced = reduced.get_snapshot()
+
+    def test_promotion_catches_up(self):
+        full = self.make_player("full")
+        reduced = self.make_player("reduced")
+        self.scheduler.add(full, 0)
+        self.scheduler.add(reduced, 1)
+        for _ in range(7):
+            self.scheduler.tick(1)
+        self.assertNotEqual(full.get_snapshot(), reduced.get_snapshot())
+        self.scheduler.set_tier(reduced, 0)
+        self.assertEqual(full.get_snapshot(), reduced.get_snapshot())
+        self.assertEqual(self.events["full"], self.events["reduced"])
+        self.scheduler.tick(1)
+        self.assertEqual(full.get_snapshot(), reduced.get_snapshot())
+
+    def test_added_mid_interval(self):
+        self.scheduler.tick(1)
+        self.scheduler.tick(1)
+        player = self.make_player("late")
+        self.scheduler.add(player, 1)
+        self.scheduler.tick(1)
+        self.scheduler.tick(1)
+        self.assertEqual((0, 4, 1), player.get_snapshot())
+
+    def test_remove(self):
+        player = self.make_player("removed")
+        self.scheduler.add(player, 1)
+        self.scheduler.tick(1)
+        self.scheduler.remove(player)
+        self.assertEqual((0, 5, 1), player.get_snapshot())
+        self.scheduler.tick(1)
+        self.assertEqual((0, 5, 1), player.get_snapshot())
@@ -0,0 +1,62 @@
+import unittest2
+from sprite import metrics
+from sprite.atlas import Atlas
+from sprite.component import SpriteComponent
+from sprite.animation import SpriteAnimation, SpriteAnimationStage, SpriteAnimationPlayer
+from test.sprite import FRONT1
+import datetime as dt
+import io
+import logging
+
+
+LOG = logging.getLogger(__name__)
+
+
+class TestMetrics(unittest2.TestCase):
+
+    def setUp(self):
+        self.records = []
+        metrics.reset()
+        metrics.enable(sink=lambda *record: self.records.append(record))
+
+    def tearDown(self):
+        metrics.disable()
+        metrics.reset()
+
+    def test_disabled(self):
+        metrics.disable()
+        Atlas(min_size=(8, 8))
+        with metrics.timer("nothing"):
+            pass
+        self.assertEqual({"counters": {}, "timers": {}}, metrics.get_snapshot())
+
+    def test_atlas(self):
+        atlas = Atlas(min_size=(8, 8))
+        atlas.add_component(SpriteComponent("front1", filepath=FRONT1))
+        atlas.dump_atlas(io.BytesIO())
+        snapshot = metrics.get_snapshot()
+        self.assertEqual(3, snapshot["counters"]["atlas.resets"])
+        self.assertTrue(snapshot["counters"]["atlas.containers"] > 3)
+        for name in ["component.image_open", "atlas.paste", "atlas.encode"]:
+            self.assertEqual(1, snapshot["timers"][name]["count"])
+        self.assertIn((metrics.COUNTER, "atlas.resets", 1), self.records)
+
+    def test_player(self):
+        animation = SpriteAnimation("test", [
+            SpriteAnimationStage("a", 0.1, events=["step"]),
+            SpriteAnimationStage("b", 0.1),
+        ])
+        player = SpriteAnimationPlayer(None, animation)
+        player.start_animation()
+        player.pass_animation_time(dt.timedelta(seconds=0.5))
+        counters = metrics.get_snapshot()["counters"]
+        self.assertEqual(2, counters["player.stage_transitions"])
+        self.assertEqual(1, counters["player.hooks"])
+        self.assertEqual(1, counters["player.events"])
+
+    def test_threads(self):
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            for _ in range(8):
+                executor.submit(lambda: [metrics.incr("threaded") for _ in range(2000)])
+        self.assertEqual(16000, metrics.get_snapshot()["counters"]["threaded"])
@@ -0,0 +1,77 @@
+import unittest2
+from sprite.residency import AtlasPageManager
+import asyncio
+import logging
+import threading
+
+
+LOG = logging.getLogger(__name__)
+
+
+class TestAtlasPageManager(unittest2.TestCase):
+
+    def setUp(self):
+        self.loaded = []
+        self.manager = AtlasPageManager(
+            loader=self.load, get_size_bytes=len, max_bytes=25, workers=2
+        )
+
+    def tearDown(self):
+        self.manager.shutdown()
+
+    def load(self, path):
+        self.loaded.append(path)
+        if path == "missing":
+            raise IOError("No such page")
+        return path * 10
+
+    def test_acquire(self):
+        self.assertEqual("aaaaaaaaaa", self.manager.acquire("a").result())
+        self.assertTrue(self.manager.is_loaded("a"))
+        self.assertEqual(10, self.manager.size_bytes)
+
+    def test_loaded_once(self):
+        self.manager.prefetch("a").result()
+        self.manager.acquire("a").result()
+        self.assertEqual(["a"], self.loaded)
+
+    def test_evicts_unused(self):
+        self.manager.prefetch("a").result()
+        self.manager.acquire("b").result()
+        self.manager.acquire("c").result()
+        self.assertFalse(self.manager.is_loaded("a"))
+        self.assertEqual(20, self.manager.size_bytes)
+        self.assertEqual(1, self.manager.get_stats()["evictions"])
+
+    def test_keeps_used(self):
+        for path in ["a", "b", "c"]:
+            self.manager.acquire(path).result()
+        self.assertEqual(30, self.manager.size_bytes)
+        self.manager.release("b")
+        self.assertFalse(self.manager.is_loaded("b"))
+        self.assertTrue(self.manager.is_loaded("a"))
+
+    def test_release_not_acquired(self):
+        self.manager.prefetch("a").result()
+        self.assertRaises(ValueError, self.manager.release, "a")
+
+    def test_failed_load(self):
+        self.assertRaises(IOError, self.manager.acquire("missing").result)
+        self.assertEqual(0, self.manager.get_stats()["pages"])
+        self.manager.release("missing")
+        self.assertRaises(ValueError, self.manager.release, "missing")
+
+    def test_blocking_loader(self):
+        event = threading.Event()
+        manager = AtlasPageManager(loader=lambda path: event.wait() and path, get_size_bytes=len)
+        future = manager.acquire("a")
+        self.assertIsNone(manager.get("a"))
+        self.assertEqual(1, manager.get_stats()["loading"])
+        event.set()
+        self.assertEqual("a", future.result())
+        manager.shutdown()
+
+    def test_acquire_async(self):
+        async def load():
+            return await self.manager.acquire_async("a")
+        self.assertEqual("aaaaaaaaaa", asyncio.run(load()))
@@ -0,0 +1,55 @@
+import unittest2
+from sprite.component import SpriteComponent, Rect
+from sprite.animation import SpriteAnimation, SpriteAnimationStage, SpriteAnimationPlayer
+import datetime as dt
+from sprite.schedule import FrameSchedule
+import logging
+
+
+LOG = logging.getLogger(__name__)
+
+
+class TestFrameSchedule(unittest2.TestCase):
+
+    def setUp(self):
+        self.components = {
+            "a": SpriteComponent("a", rect=Rect(0, 0, 10, 20)),
+            "b": SpriteComponent("b", rect=Rect(10, 0, 30, 40)),
+        }
+        self.animations = [
+            SpriteAnimation("walk", [
+                SpriteAnimationStage("a", 0.25),
+                SpriteAnimationStage("b", 0.5, displacement_x=2, displacement_y=-1),
+            ]),
+            SpriteAnimation("idle", [SpriteAnimationStage("b", 1.0)]),
+        ]
+        self.schedule = FrameSchedule.build(self.animations, self.components, (100, 100))
+
+    def test_arrays(self):
+        self.assertEqual([0, 2, 3], list(self.schedule.animation_starts))
+        self.assertEqual([0.25, 0.75, 1.0], list(self.schedule.stage_ends))
+        self.assertEqual([0, 0, 10, 20, 10, 0, 30, 40, 10, 0, 30, 40], list(self.schedule.rects))
+        self.assertEqual([0, 0, 2, -1, 0, 0], list(self.schedule.displacements))
+        self.assertAlmostEqual(0.3, self.schedule.uv_rects[6])
+
+    def test_stage_index(self):
+        walk = self.schedule.get_animation_index("walk")
+        idle = self.schedule.get_animation_index("idle")
+        self.assertEqual(0, self.schedule.get_stage_index(walk, 0.1))
+        self.assertEqual(1, self.schedule.get_stage_index(walk, 0.5))
+        self.assertIsNone(self.schedule.get_stage_index(walk, 0.8))
+        self.assertEqual(0, self.schedule.get_stage_index(walk, 0.8, loop=True))
+        self.assertEqual(2, self.schedule.get_stage_index(idle, 0.5))
+
+    def test_boundaries_match_player(self):
+        animation = SpriteAnimation("steps", [
+            SpriteAnimationStage("a", 0.1), SpriteAnimationStage("a", 0.2),
+            SpriteAnimationStage("a", 0.3),
+        ])
+        schedule = FrameSchedule.build([animation], self.components, (100, 100))
+        for time in [0.1, 0.29, 0.3, 0.31, 0.6]:
+            player = SpriteAnimationPlayer(None, animation)
+            player.start_animation()
+            player.pass_animation_time(dt.timedelta(seconds=time))
+            expected = None if player.iscomplete() else player.stage_index
+            self.assertEqual(expected, schedule.get_stage_index(0, time))
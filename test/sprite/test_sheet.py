@@ -0,0 +1,66 @@
+import unittest2
+from PIL import Image
+from sprite.component import Rect
+from sprite.sheet import Spritesheet, slice_grid, slice_meta
+from sprite.atlas import Atlas
+import io
+import logging
+
+
+LOG = logging.getLogger(__name__)
+
+
+def make_sheet_file():
+    image = Image.new("RGBA", (11, 7), (0, 0, 0, 0))
+    image.paste(Image.new("RGBA", (4, 2), (255, 0, 0, 255)), (1, 1))
+    image.paste(Image.new("RGBA", (4, 2), (0, 255, 0, 255)), (6, 1))
+    image.paste(Image.new("RGBA", (4, 2), (0, 0, 255, 255)), (1, 4))
+    f = io.BytesIO()
+    image.save(f, "PNG")
+    f.seek(0)
+    return f
+
+
+class TestSliceGrid(unittest2.TestCase):
+
+    def setUp(self):
+        self.sheet = Spritesheet(make_sheet_file())
+        self.components = slice_grid(
+            self.sheet, (4, 2), margin=1, spacing=1, name_template="walk_{row}_{column}"
+        )
+
+    def test_cells(self):
+        self.assertEqual(
+            ["walk_0_0", "walk_0_1", "walk_1_0", "walk_1_1"], list(self.components)
+        )
+        self.assertEqual(Rect(6, 4, 4, 2), self.components["walk_1_1"].sheet_rect)
+        self.assertEqual((4, 2), self.components["walk_1_1"].size)
+
+    def test_lazy(self):
+        self.assertIsNone(self.sheet._image)
+        component = self.components["walk_0_1"]
+        self.assertEqual((0, 255, 0, 255), component.image.getpixel((0, 0)))
+        self.assertIs(self.sheet.image, self.sheet._image)
+        self.assertIsNone(self.components["walk_1_0"]._image)
+
+    def test_atlas(self):
+        atlas = Atlas(min_size=(8, 8))
+        for component in self.components.values():
+            atlas.add_component(component)
+        image = atlas.render_atlas()
+        rect = self.components["walk_1_0"].rect
+        self.assertEqual((0, 0, 255, 255), image.getpixel(rect.position))
+
+
+class TestSliceMeta(unittest2.TestCase):
+
+    def test_rotated(self):
+        wide = Image.new("RGBA", (4, 2), (255, 0, 0, 255))
+        wide.putpixel((0, 0), (0, 0, 255, 255))
+        sheet = Spritesheet(image=wide.transpose(Image.ROTATE_90))
+        meta = [{"name": "wide", "x": 0, "y": 0, "width": 4, "height": 2, "rotated": True,
+                 "extra_meta": {"tag": 1}}]
+        component = slice_meta(sheet, meta)["wide"]
+        self.assertEqual((4, 2), component.size)
+        self.assertEqual({"tag": 1}, component.extra_meta)
+        self.assertEqual(wide.tobytes(), component.image.tobytes())